@@ -11,9 +11,11 @@ from rich.prompt import Confirm, IntPrompt, Prompt
 from rich.table import Table
 from rich.text import Text
 
-from .config import Config, load_config, save_config, get_default_config
+from .config import (
+    Config, SortingRule, load_config, save_config, get_default_config, with_sorting_rules
+)
 from .crawler import crawl_all
-from .inventory import scan_local
+from .inventory import load_inventory, scan_local
 from .planner import make_plan, DownloadPlanner
 from .downloader import run_plan
 from .sorter import sort_all, FileSorter
@@ -209,11 +211,8 @@ def handle_report(config: Config):
             with open(resources_file, 'r') as f:
                 resources_count = sum(1 for _ in f)
         
-        # Count local files
-        local_files_count = 0
-        if inventory_file.exists():
-            with open(inventory_file, 'r') as f:
-                local_files_count = sum(1 for _ in f)
+        # Count local files (snapshot + delta log)
+        local_files_count = len(load_inventory(inventory_file))
         
         # Show report
         table = Table(title="Sync Status Report")
@@ -238,8 +237,8 @@ def handle_report(config: Config):
         console.print(f"\n[red]✗ Report generation failed: {e}[/red]")
 
 
-def handle_config(config: Config):
-    """Handle configuration management."""
+def handle_config(config: Config) -> Config:
+    """Handle configuration management and return the (possibly updated) config."""
     console.print("\n[bold blue]🔧  Configuration[/bold blue]")
     
     config_menu = [
@@ -258,13 +257,13 @@ def handle_config(config: Config):
         choice = Prompt.ask("Select option", choices=["0", "1", "2", "3", "4"])
         
         if choice == "0":
-            break
+            return config
         elif choice == "1":
             show_config(config)
         elif choice == "2":
-            edit_download_config(config)
+            config = edit_download_config(config)
         elif choice == "3":
-            edit_sorting_rules(config)
+            config = edit_sorting_rules(config)
         elif choice == "4":
             if Confirm.ask("Reset configuration to defaults?"):
                 config = get_default_config()
@@ -298,27 +297,33 @@ def show_config(config: Config):
         console.print(f"    {i}. {rule.if_} → {rule.move_to}")
 
 
-def edit_download_config(config: Config):
-    """Edit download configuration."""
+def edit_download_config(config: Config) -> Config:
+    """Edit download configuration and return the updated config."""
     console.print("\n[bold]Download Configuration:[/bold]")
     
     # Rate limit
     new_rate = IntPrompt.ask("Rate limit (requests per second)", default=int(config.downloader.rate_limit_rps))
-    config.downloader.rate_limit_rps = float(new_rate)
     
     # Retries
     new_retries = IntPrompt.ask("Retries per strategy", default=config.downloader.retries_per_strategy)
-    config.downloader.retries_per_strategy = new_retries
     
     # Enable curl
-    config.downloader.enable_curl = Confirm.ask("Enable curl strategy?", default=config.downloader.enable_curl)
+    enable_curl = Confirm.ask("Enable curl strategy?", default=config.downloader.enable_curl)
+    
+    downloader = config.downloader.model_copy(update={
+        'rate_limit_rps': float(new_rate),
+        'retries_per_strategy': new_retries,
+        'enable_curl': enable_curl
+    })
+    config = config.model_copy(update={'downloader': downloader})
     
     save_config(config)
     console.print("[green]✓ Download configuration updated[/green]")
+    return config
 
 
-def edit_sorting_rules(config: Config):
-    """Edit sorting rules."""
+def edit_sorting_rules(config: Config) -> Config:
+    """Edit sorting rules and return the updated config."""
     console.print("\n[bold]Sorting Rules:[/bold]")
     
     while True:
@@ -334,18 +339,20 @@ def edit_sorting_rules(config: Config):
         choice = Prompt.ask("Select option", choices=["0", "1", "2"])
         
         if choice == "0":
-            break
+            return config
         elif choice == "1":
             condition = Prompt.ask("Enter condition (e.g., 'slug contains \"appalti\"')")
             destination = Prompt.ask("Enter destination path")
-            config.sorting.rules.append(config.sorting.rules[0].__class__(if_=condition, move_to=destination))
+            rule = SortingRule(if_=condition, move_to=destination)
+            config = with_sorting_rules(config, (*config.sorting.rules, rule))
             save_config(config)
             console.print("[green]✓ Rule added[/green]")
         elif choice == "2":
             if config.sorting.rules:
                 rule_num = IntPrompt.ask("Enter rule number to remove", default=1)
                 if 1 <= rule_num <= len(config.sorting.rules):
-                    del config.sorting.rules[rule_num - 1]
+                    rules = config.sorting.rules
+                    config = with_sorting_rules(config, rules[:rule_num - 1] + rules[rule_num:])
                     save_config(config)
                     console.print("[green]✓ Rule removed[/green]")
 
@@ -420,7 +427,7 @@ def interactive_mode():
             elif choice == "6":
                 handle_report(config)
             elif choice == "7":
-                handle_config(config)
+                config = handle_config(config)
             elif choice == "8":
                 handle_help()
             
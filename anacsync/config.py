@@ -1,11 +1,19 @@
 """Configuration management for ANAC Sync."""
 
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import orjson
 import yaml
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, TypeAdapter, validator
+
+# Prefer the libyaml C implementation when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as _SafeDumper, CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeDumper as _SafeDumper, SafeLoader as _SafeLoader
 
 
 class CrawlerConfig(BaseModel):
@@ -17,6 +25,8 @@ class CrawlerConfig(BaseModel):
     delay_ms_max: int = 700
     max_concurrency: int = 1
     respect_robots: bool = False
+    
+    model_config = {"frozen": True}
 
 
 class HttpConfig(BaseModel):
@@ -27,6 +37,8 @@ class HttpConfig(BaseModel):
     http2: bool = False  # Disable HTTP/2 by default to avoid h2 dependency
     headers: Dict[str, str] = Field(default_factory=dict)
     
+    model_config = {"frozen": True}
+    
     @validator('headers', pre=True)
     def set_default_headers(cls, v):
         if not v:
@@ -64,6 +76,8 @@ class DownloaderConfig(BaseModel):
     enable_curl: bool = True
     curl_path: str = "curl"
     rate_limit_rps: float = 1.0
+    
+    model_config = {"frozen": True}
 
 
 class SortingRule(BaseModel):
@@ -73,18 +87,25 @@ class SortingRule(BaseModel):
     move_to: str
     default: Optional[str] = None
     
-    model_config = {"populate_by_name": True}
+    model_config = {"populate_by_name": True, "frozen": True}
+    
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> 'SortingRule':
+        """Build a rule from already-validated data (e.g. a model_dump) without re-validating."""
+        return cls.model_construct(**data)
 
 
 class SortingConfig(BaseModel):
     """Sorting configuration."""
     
-    rules: List[SortingRule] = Field(default_factory=list)
+    rules: Tuple[SortingRule, ...] = ()
+    
+    model_config = {"frozen": True}
     
     @validator('rules', pre=True)
     def parse_rules(cls, v):
-        if isinstance(v, list):
-            return [SortingRule(**rule) if isinstance(rule, dict) else rule for rule in v]
+        if isinstance(v, (list, tuple)):
+            return tuple(SortingRule(**rule) if isinstance(rule, dict) else rule for rule in v)
         return v
 
 
@@ -93,6 +114,8 @@ class LoggingConfig(BaseModel):
     
     level: str = "INFO"
     file: Optional[str] = None
+    
+    model_config = {"frozen": True}
 
 
 class Config(BaseModel):
@@ -108,6 +131,9 @@ class Config(BaseModel):
     sorting: SortingConfig = Field(default_factory=SortingConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     
+    # Configs are immutable; derive changed ones with model_copy(update=...)
+    model_config = {"frozen": True}
+    
     @validator('state_dir', pre=True)
     def set_default_state_dir(cls, v):
         if v is None:
@@ -126,6 +152,40 @@ class Config(BaseModel):
         return v
 
 
+# Built once at import so loads reuse the compiled core schema
+_CONFIG_ADAPTER = TypeAdapter(Config)
+
+
+def _json_cache_path(config_path: Path) -> Path:
+    """Get the JSON copy written next to a YAML config file."""
+    return config_path.with_name(config_path.name + '.json')
+
+
+@lru_cache(maxsize=32)
+def _load_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a YAML (or JSON copy) config file; cached by path, mtime and size."""
+    if path.endswith('.json'):
+        return orjson.loads(Path(path).read_bytes()) or {}
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_SafeLoader) or {}
+
+
+def _load_json_copy(config_path: Path, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+    """Get the config data from the JSON copy if it was written for this exact YAML."""
+    json_path = _json_cache_path(config_path)
+    try:
+        json_stat = json_path.stat()
+        cached = _load_cached(str(json_path.absolute()), json_stat.st_mtime_ns, json_stat.st_size)
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    
+    # Any change to the YAML (even one keeping an older mtime) changes mtime or size
+    if not isinstance(cached, dict) or cached.get('yaml') != {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}:
+        return None
+    return cached.get('config')
+
+
 def load_config(config_path: Optional[str] = None) -> Config:
     """Load configuration from file or create default."""
     if config_path is None:
@@ -133,18 +193,24 @@ def load_config(config_path: Optional[str] = None) -> Config:
     
     config_path = Path(config_path)
     
-    if config_path.exists():
-        with open(config_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f) or {}
-    else:
+    try:
+        stat = config_path.stat()
+    except FileNotFoundError:
         data = {}
+    else:
+        # Parsed data is cached per file version. Only the top level is
+        # mutated below; validation builds fresh nested containers.
+        data = _load_json_copy(config_path, stat)
+        if data is None:
+            data = _load_cached(str(config_path.absolute()), stat.st_mtime_ns, stat.st_size)
+        data = dict(data)
     
     # Ensure state_dir is set if not provided
     if 'state_dir' not in data or data['state_dir'] is None:
         data['state_dir'] = str(Path.home() / ".anacsync")
     
     # Create default configuration
-    config = Config(**data)
+    config = _CONFIG_ADAPTER.validate_python(data)
     
     # Ensure state directory exists
     state_dir = Path(config.state_dir)
@@ -157,6 +223,10 @@ def load_config(config_path: Optional[str] = None) -> Config:
     return config
 
 
+# Let callers (e.g. tests) drop cached parses
+load_config.cache_clear = _load_cached.cache_clear
+
+
 def save_config(config: Config, config_path: Optional[str] = None) -> None:
     """Save configuration to file."""
     if config_path is None:
@@ -165,20 +235,30 @@ def save_config(config: Config, config_path: Optional[str] = None) -> None:
     config_path = Path(config_path)
     config_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Convert to dict and handle aliases
-    data = config.dict(by_alias=True, exclude_none=True)
+    # Convert to plain (JSON-compatible) data and handle aliases
+    data = config.model_dump(mode='json', by_alias=True, exclude_none=True)
     
     with open(config_path, 'w', encoding='utf-8') as f:
-        yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+        yaml.dump(data, f, Dumper=_SafeDumper, default_flow_style=False, sort_keys=False)
+    
+    # Fast-loading JSON copy, tied to the exact YAML file version just written
+    stat = config_path.stat()
+    _json_cache_path(config_path).write_bytes(orjson.dumps({
+        'yaml': {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size},
+        'config': data
+    }))
+
+
+def with_sorting_rules(config: Config, rules: Iterable[SortingRule]) -> Config:
+    """Get a copy of the configuration with its sorting rules replaced."""
+    sorting = config.sorting.model_copy(update={'rules': tuple(rules)})
+    return config.model_copy(update={'sorting': sorting})
 
 
 def get_default_config() -> Config:
     """Get default configuration with example sorting rules."""
-    # Create config with explicit state_dir to ensure it's not None
-    config = Config(state_dir=str(Path.home() / ".anacsync"))
-    
-    # Add example sorting rules
-    config.sorting.rules = [
+    # Example sorting rules
+    rules = [
         SortingRule(
             if_="slug matches '^ocds-appalti-ordinari'",
             move_to="/database/JSON/aggiudicazioni_json"
@@ -197,5 +277,5 @@ def get_default_config() -> Config:
         )
     ]
     
-    return config
-
+    # Create config with explicit state_dir to ensure it's not None
+    return Config(state_dir=str(Path.home() / ".anacsync"), sorting=SortingConfig(rules=rules))
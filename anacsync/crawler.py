@@ -12,7 +12,7 @@ from selectolax.parser import HTMLParser
 from .config import Config
 from .http_client import HTTPClient
 from .utils import (
-    append_jsonl, load_jsonl, save_jsonl, merge_jsonl_records,
+    append_jsonl, read_jsonl, save_jsonl, merge_jsonl_records,
     get_timestamp, jittered_delay, sleep_with_jitter, extract_filename_from_url
 )
 
@@ -89,8 +89,8 @@ class ANACCrawler:
         self.resources_file = self.state_dir / 'catalog' / 'resources.jsonl'
         
         # Load existing data
-        self.existing_datasets = {r['slug']: r for r in load_jsonl(self.datasets_file)}
-        self.existing_resources = {(r['dataset_slug'], r['url']): r for r in load_jsonl(self.resources_file)}
+        self.existing_datasets = {r['slug']: r for r in read_jsonl(self.datasets_file)}
+        self.existing_resources = {(r['dataset_slug'], r['url']): r for r in read_jsonl(self.resources_file)}
     
     def extract_dataset_slug(self, url: str) -> Optional[str]:
         """Extract dataset slug from URL."""
@@ -4,6 +4,7 @@ import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+import orjson
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn
 from rich.table import Table
@@ -296,15 +297,14 @@ class DownloadManager:
             return []
         
         # Read last N lines
-        with open(self.history_file, 'r', encoding='utf-8') as f:
+        with open(self.history_file, 'rb') as f:
             lines = f.readlines()
         
         history = []
         for line in lines[-limit:]:
             try:
-                import json
-                history.append(json.loads(line.strip()))
-            except json.JSONDecodeError:
+                history.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
                 continue
         
         return history
@@ -1,6 +1,6 @@
 """Download strategies implementation."""
 
-import json
+import bisect
 import os
 import subprocess
 import time
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 from rich.console import Console
 
 from ..config import Config
@@ -35,9 +36,13 @@ class DownloadResult:
 class StrategyBase(ABC):
     """Base class for download strategies."""
     
+    # File size boundaries between the small/medium/large dynamic chunk sizes
+    _CHUNK_SIZE_THRESHOLDS = (50 * 1024 * 1024, 300 * 1024 * 1024)
+    
     def __init__(self, config: Config):
         self.config = config
         self.name = self.__class__.__name__
+        self._chunk_sizes = tuple(mb * 1024 * 1024 for mb in config.downloader.dynamic_chunks_mb)
     
     @abstractmethod
     def fetch(self, url: str, dest_path: Path, meta: Dict[str, Any], cfg: Config) -> DownloadResult:
@@ -47,30 +52,22 @@ class StrategyBase(ABC):
     def _get_chunk_size(self, file_size: Optional[int]) -> int:
         """Get appropriate chunk size based on file size."""
         if not file_size:
-            return self.config.downloader.dynamic_chunks_mb[0] * 1024 * 1024
-        
-        size_mb = file_size / (1024 * 1024)
+            return self._chunk_sizes[0]
         
-        if size_mb < 50:
-            return self.config.downloader.dynamic_chunks_mb[0] * 1024 * 1024
-        elif size_mb < 300:
-            return self.config.downloader.dynamic_chunks_mb[1] * 1024 * 1024
-        else:
-            return self.config.downloader.dynamic_chunks_mb[2] * 1024 * 1024
+        return self._chunk_sizes[bisect.bisect_right(self._CHUNK_SIZE_THRESHOLDS, file_size)]
     
     def _save_sidecar_meta(self, dest_path: Path, meta: Dict[str, Any]) -> None:
         """Save sidecar metadata."""
         meta_path = dest_path.with_suffix(dest_path.suffix + '.meta.json')
-        atomic_write(meta_path, json.dumps(meta, indent=2, ensure_ascii=False))
+        atomic_write(meta_path, orjson.dumps(meta, option=orjson.OPT_INDENT_2), mode='wb')
     
     def _load_sidecar_meta(self, dest_path: Path) -> Dict[str, Any]:
         """Load sidecar metadata."""
         meta_path = dest_path.with_suffix(dest_path.suffix + '.meta.json')
         if meta_path.exists():
             try:
-                with open(meta_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
+                return orjson.loads(meta_path.read_bytes())
+            except (orjson.JSONDecodeError, IOError):
                 pass
         return {}
 
@@ -225,41 +222,43 @@ class S2SparseStrategy(StrategyBase):
                 temp_path = dest_path.with_suffix(dest_path.suffix + '.part')
                 temp_path.parent.mkdir(parents=True, exist_ok=True)
                 
-                # Initialize file with correct size
-                with open(temp_path, 'wb') as f:
-                    f.seek(file_size - 1)
-                    f.write(b'\0')
-                
                 # Download segments in non-linear order
                 segment_order = self._get_segment_order(num_segments)
+                segments = list(bitmap)
                 bytes_written = 0
                 
-                for segment_idx in segment_order:
-                    if bitmap[segment_idx] == '1':
-                        continue  # Already downloaded
-                    
-                    start = segment_idx * segment_size
-                    end = min(start + segment_size - 1, file_size - 1)
-                    
-                    # Download segment
-                    content, headers, error = http_client.get_range(url, start, end)
-                    if error:
-                        continue  # Skip failed segment
+                # One unbuffered handle for every segment, synced once at the end
+                with open(temp_path, 'w+b', buffering=0) as f:
+                    # Initialize file with correct size
+                    f.truncate(file_size)
                     
-                    # Write segment
-                    with open(temp_path, 'r+b') as f:
+                    for segment_idx in segment_order:
+                        if segments[segment_idx] == '1':
+                            continue  # Already downloaded
+                        
+                        start = segment_idx * segment_size
+                        end = min(start + segment_size - 1, file_size - 1)
+                        
+                        # Download segment
+                        content, headers, error = http_client.get_range(url, start, end)
+                        if error:
+                            continue  # Skip failed segment
+                        
+                        # Write segment
                         f.seek(start)
                         f.write(content)
-                        f.flush()
-                        os.fsync(f.fileno())
-                    
-                    bytes_written += len(content)
-                    
-                    # Update bitmap
-                    bitmap = bitmap[:segment_idx] + '1' + bitmap[segment_idx + 1:]
+                        
+                        bytes_written += len(content)
+                        
+                        # Update bitmap
+                        segments[segment_idx] = '1'
+                        
+                        # Rate limiting
+                        sleep_with_jitter(100, 200)
                     
-                    # Rate limiting
-                    sleep_with_jitter(100, 200)
+                    os.fsync(f.fileno())
+                
+                bitmap = ''.join(segments)
                 
                 # Check if all segments downloaded
                 if '0' in bitmap:
@@ -316,9 +315,8 @@ class S2SparseStrategy(StrategyBase):
             order.append(middle)
         
         # Fill remaining segments
-        for i in range(1, num_segments - 1):
-            if i not in order:
-                order.append(i)
+        seen = set(order)
+        order.extend(i for i in range(1, num_segments - 1) if i not in seen)
         
         return order
 
@@ -556,24 +554,20 @@ class S5TailFirstStrategy(StrategyBase):
                 temp_path = dest_path.with_suffix(dest_path.suffix + '.part')
                 temp_path.parent.mkdir(parents=True, exist_ok=True)
                 
-                # Initialize file with correct size
-                with open(temp_path, 'wb') as f:
-                    f.seek(file_size - 1)
-                    f.write(b'\0')
-                
-                # Write tail
-                with open(temp_path, 'r+b') as f:
-                    f.seek(tail_start)
-                    f.write(tail_content)
-                    f.flush()
-                    os.fsync(f.fileno())
-                
                 # Download remaining content
                 chunk_size = self._get_chunk_size(file_size)
                 bytes_written = len(tail_content)
                 offset = 0
                 
-                with open(temp_path, 'r+b') as f:
+                # One unbuffered handle for tail and body, synced once at the end
+                with open(temp_path, 'w+b', buffering=0) as f:
+                    # Initialize file with correct size
+                    f.truncate(file_size)
+                    
+                    # Write tail
+                    f.seek(tail_start)
+                    f.write(tail_content)
+                    
                     while offset < tail_start:
                         end = min(offset + chunk_size - 1, tail_start - 1)
                         
@@ -591,14 +585,14 @@ class S5TailFirstStrategy(StrategyBase):
                         # Write chunk
                         f.seek(offset)
                         f.write(content)
-                        f.flush()
-                        os.fsync(f.fileno())
                         
                         bytes_written += len(content)
                         offset += len(content)
                         
                         # Rate limiting
                         sleep_with_jitter(100, 200)
+                    
+                    os.fsync(f.fileno())
                 
                 # Atomic move
                 os.replace(temp_path, dest_path)
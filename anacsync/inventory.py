@@ -1,40 +1,77 @@
 """Local file inventory scanner."""
 
-import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+import orjson
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 
 from .config import Config
 from .utils import (
-    load_jsonl, save_jsonl, get_file_info, calculate_sha256,
-    get_timestamp, safe_filename, ensure_directory
+    read_jsonl, save_jsonl, get_file_info, calculate_sha256, compute_sha256_many,
+    get_timestamp, safe_filename, ensure_directory, iter_files, append_jsonl_many
 )
 
 console = Console()
 
+# Compact the delta log into the snapshot once it exceeds this fraction of it
+DELTA_COMPACTION_RATIO = 0.25
 
+
+def get_inventory_delta_file(inventory_file: Path) -> Path:
+    """Get the delta log path that belongs to an inventory snapshot."""
+    return inventory_file.with_name(inventory_file.stem + '.delta.jsonl')
+
+
+def load_inventory(inventory_file: Path) -> Dict[str, Dict[str, Any]]:
+    """Load inventory snapshot and overlay the delta log (last write wins)."""
+    records = {r['path']: r for r in read_jsonl(inventory_file)}
+    
+    for record in read_jsonl(get_inventory_delta_file(inventory_file)):
+        if record.get('deleted'):
+            records.pop(record['path'], None)
+        else:
+            records[record['path']] = record
+    
+    return records
+
+
+def save_inventory(inventory_file: Path, records: Iterable[Dict[str, Any]]) -> None:
+    """Write a compacted inventory snapshot and drop the delta log."""
+    save_jsonl(inventory_file, list(records))
+    get_inventory_delta_file(inventory_file).unlink(missing_ok=True)
+
+
+def append_inventory_delta(inventory_file: Path, records: List[Dict[str, Any]]) -> None:
+    """Append changed records (or deletion tombstones) to the delta log."""
+    append_jsonl_many(get_inventory_delta_file(inventory_file), records, durable=False)
+
+
+def inventory_needs_compaction(inventory_file: Path) -> bool:
+    """Check whether the delta log has grown enough to be merged."""
+    delta_file = get_inventory_delta_file(inventory_file)
+    if not delta_file.exists():
+        return False
+    
+    if not inventory_file.exists():
+        return True
+    
+    return delta_file.stat().st_size > DELTA_COMPACTION_RATIO * inventory_file.stat().st_size
+
+
+@dataclass(slots=True)
 class LocalFileRecord:
     """Local file record structure."""
-    
-    def __init__(
-        self,
-        path: str,
-        sha256: str,
-        size: int,
-        mtime: str,
-        dataset_slug: Optional[str] = None,
-        url: Optional[str] = None
-    ):
-        self.path = path
-        self.sha256 = sha256
-        self.size = size
-        self.mtime = mtime
-        self.dataset_slug = dataset_slug
-        self.url = url
+    path: str
+    sha256: str
+    size: int
+    mtime: str
+    dataset_slug: Optional[str] = None
+    url: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -56,15 +93,20 @@ class InventoryScanner:
         self.inventory_file = self.state_dir / 'local' / 'inventory.jsonl'
         self.root_dir = Path(config.root_dir)
         
-        # Load existing inventory
-        self.existing_files = {r['path']: r for r in load_jsonl(self.inventory_file)}
+        # Load existing inventory (snapshot + delta log)
+        self.existing_files = load_inventory(self.inventory_file)
         
-        # Supported file extensions - only JSON files
-        self.supported_extensions = {'.json', '.ndjson'}
+        # Supported file extensions - only JSON files (lowercase, for str.endswith)
+        self._supported_suffixes = ('.json', '.ndjson')
+    
+    def is_supported_name(self, name: str) -> bool:
+        """Check if a file name has a supported extension (sidecars excluded)."""
+        name = name.lower()
+        return name.endswith(self._supported_suffixes) and not name.endswith('.meta.json')
     
     def is_supported_file(self, file_path: Path) -> bool:
         """Check if file has supported extension."""
-        return file_path.suffix.lower() in self.supported_extensions
+        return self.is_supported_name(file_path.name)
     
     def load_sidecar_meta(self, file_path: Path) -> Optional[Dict[str, Any]]:
         """Load metadata from sidecar file."""
@@ -74,9 +116,8 @@ class InventoryScanner:
             return None
         
         try:
-            with open(meta_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            return orjson.loads(meta_path.read_bytes())
+        except (orjson.JSONDecodeError, IOError):
             return None
     
     def save_sidecar_meta(self, file_path: Path, meta: Dict[str, Any]) -> None:
@@ -84,8 +125,21 @@ class InventoryScanner:
         meta_path = file_path.with_suffix(file_path.suffix + '.meta.json')
         ensure_directory(meta_path.parent)
         
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(meta, f, indent=2, ensure_ascii=False)
+        # orjson emits UTF-8 bytes directly, so the whole sidecar is one write()
+        data = orjson.dumps(meta, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        with open(meta_path, 'wb') as f:
+            f.write(data)
+    
+    def save_sidecar_meta_many(
+        self,
+        pairs: Iterable[Tuple[Path, Dict[str, Any]]],
+        max_workers: int = 8
+    ) -> None:
+        """Save many sidecar metadata files, overlapping the file I/O."""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Consume the iterator so worker exceptions are raised here
+            for _ in executor.map(lambda pair: self.save_sidecar_meta(*pair), pairs):
+                pass
     
     def extract_dataset_slug_from_path(self, file_path: Path) -> Optional[str]:
         """Extract dataset slug from file path using heuristics."""
@@ -135,7 +189,7 @@ class InventoryScanner:
             # Try to find matching resource in catalog
             resources_file = self.state_dir / 'catalog' / 'resources.jsonl'
             if resources_file.exists():
-                for resource in load_jsonl(resources_file):
+                for resource in read_jsonl(resources_file):
                     if resource.get('dataset_slug') == dataset_slug:
                         # Check if filename matches
                         resource_name = resource.get('name', '')
@@ -144,8 +198,8 @@ class InventoryScanner:
         
         return dataset_slug, None
     
-    def scan_file(self, file_path: Path) -> Optional[LocalFileRecord]:
-        """Scan a single file and return record."""
+    def scan_file(self, file_path: Path, sha256: Optional[str] = None) -> Optional[LocalFileRecord]:
+        """Scan a single file and return record (optionally with a precomputed hash)."""
         if not file_path.exists() or not file_path.is_file():
             return None
         
@@ -154,7 +208,7 @@ class InventoryScanner:
         
         try:
             # Get file info
-            file_info = get_file_info(file_path)
+            file_info = get_file_info(file_path, sha256)
             if not file_info:
                 return None
             
@@ -209,6 +263,9 @@ class InventoryScanner:
             'directories_scanned': 0
         }
         
+        # Records that changed during this scan, persisted to the delta log
+        changed_records = []
+        
         # Ensure root directory exists
         if not self.root_dir.exists():
             console.print(f"[yellow]Root directory {self.root_dir} does not exist, creating...[/yellow]")
@@ -225,18 +282,23 @@ class InventoryScanner:
         ) as progress:
             task = progress.add_task("Scanning files...", total=None)
             
-            # Get all files first to show progress
+            # Get all files first to show progress (single walk, also used for removals)
             all_files = []
-            for file_path in self.root_dir.rglob('*'):
-                if file_path.is_file() and self.is_supported_file(file_path):
-                    all_files.append(file_path)
+            for entry in iter_files(self.root_dir):
+                if self.is_supported_name(entry.name):
+                    all_files.append(Path(entry.path))
+            current_files = {str(file_path) for file_path in all_files}
+            
+            # Hash all files concurrently, then build records serially
+            progress.update(task, description=f"Hashing {len(all_files)} files...")
+            digests = compute_sha256_many(all_files)
             
             progress.update(task, total=len(all_files))
             
             for i, file_path in enumerate(all_files):
                 progress.update(task, description=f"Scanning {file_path.name}...")
                 
-                record = self.scan_file(file_path)
+                record = self.scan_file(file_path, digests.get(file_path))
                 if record:
                     stats['files_found'] += 1
                     
@@ -248,29 +310,30 @@ class InventoryScanner:
                             existing['size'] != record.size or 
                             existing['mtime'] != record.mtime):
                             self.existing_files[record.path] = record.to_dict()
+                            changed_records.append(self.existing_files[record.path])
                             stats['files_updated'] += 1
                         # else: file unchanged, keep existing record
                     else:
                         # New file
                         self.existing_files[record.path] = record.to_dict()
+                        changed_records.append(self.existing_files[record.path])
                         stats['files_new'] += 1
                 
                 stats['files_scanned'] += 1
                 progress.advance(task)
         
         # Check for removed files
-        current_files = set()
-        for file_path in self.root_dir.rglob('*'):
-            if file_path.is_file() and self.is_supported_file(file_path):
-                current_files.add(str(file_path))
-        
-        removed_files = set(self.existing_files.keys()) - current_files
+        removed_files = self.existing_files.keys() - current_files
         for removed_path in removed_files:
             del self.existing_files[removed_path]
+            changed_records.append({'path': removed_path, 'deleted': True})
             stats['files_removed'] += 1
         
-        # Save updated inventory
-        save_jsonl(self.inventory_file, list(self.existing_files.values()))
+        # Persist only what changed, compacting once the delta log grows too large
+        if changed_records:
+            append_inventory_delta(self.inventory_file, changed_records)
+        if inventory_needs_compaction(self.inventory_file):
+            save_inventory(self.inventory_file, self.existing_files.values())
         
         console.print(f"[green]Scan completed![/green]")
         console.print(f"Files scanned: {stats['files_scanned']}")
@@ -317,8 +380,9 @@ class InventoryScanner:
                         size=file_info['size'],
                         mtime=file_info['mtime']
                     )
-                    self.existing_files[str(file_path)] = new_record.to_dict()
-                    save_jsonl(self.inventory_file, list(self.existing_files.values()))
+                    record = new_record.to_dict()
+                    self.existing_files[str(file_path)] = record
+                    append_inventory_delta(self.inventory_file, [record])
                     return True
             
             return False
@@ -1,42 +1,35 @@
 """Download planning based on catalog vs inventory diff."""
 
+import os
 import re
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Tuple
 
+import orjson
 from rich.console import Console
 from rich.table import Table
 
 from .config import Config
 from .utils import (
-    load_jsonl, save_jsonl, get_timestamp, safe_filename,
+    read_jsonl, get_timestamp, safe_filename,
     extract_filename_from_url, ensure_directory
 )
 
 console = Console()
 
 
+@dataclass(slots=True)
 class PlanItem:
     """Download plan item."""
-    
-    def __init__(
-        self,
-        dataset_slug: str,
-        resource_url: str,
-        dest_path: str,
-        reason: str,
-        size: Optional[int] = None,
-        etag: Optional[str] = None,
-        resource_name: Optional[str] = None
-    ):
-        self.dataset_slug = dataset_slug
-        self.resource_url = resource_url
-        self.dest_path = dest_path
-        self.reason = reason
-        self.size = size
-        self.etag = etag
-        self.resource_name = resource_name
+    dataset_slug: str
+    resource_url: str
+    dest_path: str
+    reason: str
+    size: Optional[int] = None
+    etag: Optional[str] = None
+    resource_name: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -69,13 +62,14 @@ class DownloadPlanner:
     
     def load_catalog(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
         """Load catalog data (datasets and resources)."""
-        datasets = {r['slug']: r for r in load_jsonl(self.datasets_file)}
-        resources = {(r['dataset_slug'], r['url']): r for r in load_jsonl(self.resources_file)}
+        datasets = {r['slug']: r for r in read_jsonl(self.datasets_file)}
+        resources = {(r['dataset_slug'], r['url']): r for r in read_jsonl(self.resources_file)}
         return datasets, resources
     
     def load_inventory(self) -> Dict[str, Dict[str, Any]]:
         """Load local inventory."""
-        return {r['path']: r for r in load_jsonl(self.inventory_file)}
+        from .inventory import load_inventory
+        return load_inventory(self.inventory_file)
     
     def generate_dest_path(self, resource: Dict[str, Any], dataset: Dict[str, Any]) -> str:
         """Generate destination path for a resource."""
@@ -142,20 +136,17 @@ class DownloadPlanner:
         if not local_file:
             return True, "missing"
         
-        # Check if file size changed
-        if resource.get('content_length') and local_file.get('size'):
-            if resource['content_length'] != local_file['size']:
-                return True, "size_changed"
-        
-        # Check if ETag changed
-        if resource.get('etag') and local_file.get('sha256'):
-            # For now, we can't directly compare ETag with SHA256
-            # This would require storing ETag in sidecar metadata
-            pass
+        # Compare size fingerprints once; unknown sizes are normalized to 0.
+        # ETag can't be compared with SHA256 until it is stored in sidecar metadata.
+        remote_size = resource.get('content_length') or 0
+        local_size = local_file.get('size') or 0
         
-        # Check if file is corrupted (size 0 or very small for non-empty resource)
-        if local_file.get('size', 0) == 0 and resource.get('content_length', 0) > 0:
-            return True, "corrupted"
+        if remote_size != local_size:
+            # Empty local file for a non-empty resource
+            if not local_size:
+                return True, "corrupted"
+            if remote_size:
+                return True, "size_changed"
         
         # File exists and seems up to date
         return False, "up_to_date"
@@ -245,7 +236,7 @@ class DownloadPlanner:
         if plan_items:
             plan_filename = f"plan-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
             plan_file = self.plans_dir / plan_filename
-            save_jsonl(plan_file, [item.to_dict() for item in plan_items])
+            self.save_plan(plan_file, plan_items)
             console.print(f"[green]Plan saved to {plan_file}[/green]")
         
         # Display statistics
@@ -253,6 +244,26 @@ class DownloadPlanner:
         
         return plan_items
     
+    def save_plan(self, plan_file: Path, plan_items: List[PlanItem]) -> None:
+        """Stream plan items to a JSONL file through one large write buffer."""
+        # Stream into a temp file so a failed save never leaves a partial plan
+        temp_path = f"{plan_file}.tmp.{os.getpid()}"
+        
+        try:
+            with open(temp_path, 'wb', buffering=1 << 20) as f:
+                for item in plan_items:
+                    # orjson serializes slotted dataclasses natively, no dict needed
+                    f.write(orjson.dumps(item))
+                    f.write(b'\n')
+            
+            os.replace(temp_path, plan_file)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+    
     def _display_plan_stats(self, stats: Dict[str, Any], plan_items: List[PlanItem]) -> None:
         """Display planning statistics."""
         table = Table(title="Download Plan Statistics")
@@ -301,7 +312,7 @@ class DownloadPlanner:
         # Sort by modification time, get latest
         latest_plan = max(plan_files, key=lambda p: p.stat().st_mtime)
         
-        plan_data = load_jsonl(latest_plan)
+        plan_data = read_jsonl(latest_plan)
         return [PlanItem(**item) for item in plan_data]
     
     def get_plan_summary(self, plan_items: List[PlanItem]) -> Dict[str, Any]:
@@ -1,20 +1,100 @@
 """File sorting based on configurable rules."""
 
+import os
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from types import CodeType
+from typing import Any, Callable, Dict, FrozenSet, Generator, List, Optional, Set, Tuple
 
 from rich.console import Console
 from rich.table import Table
 
-from .config import Config, SortingRule
+from .config import Config, SortingRule, with_sorting_rules
+from .inventory import (
+    load_inventory, save_inventory, append_inventory_delta, inventory_needs_compaction,
+    get_inventory_delta_file
+)
 from .utils import (
-    load_jsonl, save_jsonl, atomic_write, get_timestamp,
-    ensure_directory, safe_filename
+    atomic_write, get_timestamp,
+    ensure_directory, safe_filename, iter_files, JsonlAppender
 )
 
 console = Console()
 
+
+@lru_cache(maxsize=512)
+def _compile_expr(src: str) -> Optional[CodeType]:
+    """Compile a rule expression once; None marks a source that failed to parse."""
+    try:
+        return compile(src, '<anacsync-rule>', 'eval')
+    except SyntaxError:
+        return None
+
+
+# Lowercase extensions of files considered by the sorter
+_SORT_EXTS = frozenset(('.json', '.ndjson', '.csv', '.xlsx', '.xml', '.zip'))
+
+# Lowercase extensions of dataset files already in a target directory
+_DATASET_EXTS = frozenset(('.json', '.ndjson'))
+
+# File format by lowercase extension, for the 'format' rule field
+_EXT2FMT = {
+    '.json': 'JSON',
+    '.csv': 'CSV',
+    '.xlsx': 'XLSX',
+    '.xml': 'XML',
+    '.zip': 'ZIP'
+}
+
+
+@lru_cache(maxsize=100_000)
+def _base_file_context(path_str: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Build the path-derived part of a file's sorting context.
+    
+    Keyed by mtime/size so a changed file gets a fresh entry. The returned dict
+    is shared through the cache and must not be mutated.
+    """
+    file_path = Path(path_str)
+    return {
+        'path': path_str,
+        'filename': file_path.name,
+        'stem': file_path.stem,
+        'suffix': file_path.suffix,
+        'parent': str(file_path.parent),
+        'size': size,
+        'format': _EXT2FMT.get(file_path.suffix.lower(), 'UNKNOWN')
+    }
+
+
+def _iter_candidate_files(root: Path, exts: FrozenSet[str] = _SORT_EXTS) -> Generator[Path, None, None]:
+    """Recursively yield sortable files, filtering on the raw entry name."""
+    for entry in iter_files(root):
+        name = entry.name
+        dot = name.rfind('.')
+        if dot >= 0 and name[dot:].lower() in exts:
+            yield Path(entry.path)
+
+
+@dataclass(slots=True)
+class _CompiledCondition:
+    """Sorting condition parsed once into a predicate over file context."""
+    kind: str
+    predicate: Callable[[Dict[str, Any]], bool]
+    field: Optional[str] = None
+    operand: Optional[str] = None
+    pattern: Optional[re.Pattern] = None
+
+
+@dataclass(slots=True)
+class _CompiledRule:
+    """Sorting rule with its condition and destination resolved up front."""
+    rule: SortingRule
+    condition: _CompiledCondition
+    destination: Optional[Callable[[Path], Path]]
+
+
 # Mapping from dataset slugs to directory names based on existing structure
 DATASET_TO_DIRECTORY_MAPPING = {
     # OCDS datasets
@@ -102,7 +182,19 @@ class FileSorter:
         self.inventory_file = self.state_dir / 'local' / 'inventory.jsonl'
         
         # Load existing inventory
-        self.inventory = {r['path']: r for r in load_jsonl(self.inventory_file)}
+        self.inventory = load_inventory(self.inventory_file)
+        
+        # Parse sorting rules once instead of per file
+        self._compile_rules()
+        
+        # Destination directories already created, shared across files
+        self._ensured_dirs: Set[str] = set()
+        
+        # Resolved directory paths, shared across files
+        self._resolved_dirs: Dict[str, Path] = {}
+        
+        # Open delta-log appender while sort_all is running
+        self._journal: Optional[JsonlAppender] = None
     
     def get_target_directory(self, dataset_slug: str) -> str:
         """Get target directory for a dataset slug based on existing structure."""
@@ -122,7 +214,7 @@ class FileSorter:
         
         if target_dir.exists() and target_dir.is_dir():
             for file_path in target_dir.iterdir():
-                if file_path.is_file() and file_path.suffix.lower() in {'.json', '.ndjson'}:
+                if file_path.suffix.lower() in _DATASET_EXTS and file_path.is_file():
                     try:
                         stat = file_path.stat()
                         existing_files.append({
@@ -137,79 +229,159 @@ class FileSorter:
         
         return existing_files
     
-    def _evaluate_condition(self, condition: str, context: Dict[str, Any]) -> bool:
-        """Evaluate a sorting condition against file context."""
+    def _compile_condition(self, condition: str) -> _CompiledCondition:
+        """Parse a sorting condition once into a predicate over file context."""
         try:
             # Parse condition
             if ' matches ' in condition:
                 field, pattern = condition.split(' matches ', 1)
                 field = field.strip()
-                pattern = pattern.strip().strip('"\'')
+                pattern_obj = re.compile(pattern.strip().strip('"\''), re.IGNORECASE)
+                search = pattern_obj.search
                 
-                value = context.get(field, '')
-                if isinstance(value, str):
-                    return bool(re.search(pattern, value, re.IGNORECASE))
+                def predicate(context: Dict[str, Any]) -> bool:
+                    value = context.get(field, '')
+                    return isinstance(value, str) and search(value) is not None
+                
+                return _CompiledCondition('matches', predicate, field, pattern_obj.pattern, pattern_obj)
             
             elif ' contains ' in condition:
                 field, substring = condition.split(' contains ', 1)
                 field = field.strip()
-                substring = substring.strip().strip('"\'')
+                substring = substring.strip().strip('"\'').lower()
+                
+                def predicate(context: Dict[str, Any]) -> bool:
+                    value = context.get(field, '')
+                    return isinstance(value, str) and substring in value.lower()
                 
-                value = context.get(field, '')
-                if isinstance(value, str):
-                    return substring.lower() in value.lower()
+                return _CompiledCondition('contains', predicate, field, substring)
             
             elif ' == ' in condition:
                 field, expected = condition.split(' == ', 1)
                 field = field.strip()
                 expected = expected.strip().strip('"\'')
                 
-                value = context.get(field, '')
-                return str(value) == expected
+                def predicate(context: Dict[str, Any]) -> bool:
+                    return str(context.get(field, '')) == expected
+                
+                return _CompiledCondition('==', predicate, field, expected)
             
             elif ' != ' in condition:
                 field, expected = condition.split(' != ', 1)
                 field = field.strip()
                 expected = expected.strip().strip('"\'')
                 
-                value = context.get(field, '')
-                return str(value) != expected
+                def predicate(context: Dict[str, Any]) -> bool:
+                    return str(context.get(field, '')) != expected
+                
+                return _CompiledCondition('!=', predicate, field, expected)
             
             elif condition.strip() == 'true':
-                return True
+                return _CompiledCondition('true', lambda context: True)
             
             elif condition.strip() == 'false':
-                return False
+                return _CompiledCondition('false', lambda context: False)
             
             else:
-                # Try to evaluate as Python expression (with limited context)
-                safe_context = {
-                    'slug': context.get('slug', ''),
-                    'filename': context.get('filename', ''),
-                    'url': context.get('url', ''),
-                    'format': context.get('format', ''),
-                    'size': context.get('size', 0),
-                    'path': context.get('path', ''),
-                    'dataset_slug': context.get('dataset_slug', '')
-                }
+                # Evaluate as Python expression (with limited context)
+                code = _compile_expr(condition)
+                if code is None:
+                    raise SyntaxError("invalid rule expression")
+                
+                def predicate(context: Dict[str, Any]) -> bool:
+                    safe_context = {
+                        'slug': context.get('slug', ''),
+                        'filename': context.get('filename', ''),
+                        'url': context.get('url', ''),
+                        'format': context.get('format', ''),
+                        'size': context.get('size', 0),
+                        'path': context.get('path', ''),
+                        'dataset_slug': context.get('dataset_slug', '')
+                    }
+                    
+                    try:
+                        return bool(eval(code, {"__builtins__": {}}, safe_context))
+                    except Exception as e:
+                        console.print(f"[yellow]Warning: Could not evaluate condition '{condition}': {e}[/yellow]")
+                        return False
                 
-                # Simple evaluation for basic conditions
-                return eval(condition, {"__builtins__": {}}, safe_context)
+                return _CompiledCondition('expr', predicate)
         
         except Exception as e:
             console.print(f"[yellow]Warning: Could not evaluate condition '{condition}': {e}[/yellow]")
-            return False
+            return _CompiledCondition('invalid', lambda context: False)
+    
+    def _compile_destination(self, rule: SortingRule) -> Optional[Callable[[Path], Path]]:
+        """Resolve a rule's destination once into a function of the source file."""
+        if rule.move_to:
+            dest_path = Path(rule.move_to)
+        elif rule.default:
+            dest_path = Path(rule.default)
+        else:
+            return None
+        
+        # Make path absolute if relative
+        if not dest_path.is_absolute():
+            dest_path = self.root_dir / dest_path
+        
+        if not dest_path.suffix:
+            # It's a directory
+            return lambda file_path: dest_path / file_path.name
+        # It's a file path
+        return lambda file_path: dest_path
+    
+    def _compile_rule(self, rule: SortingRule) -> _CompiledRule:
+        """Compile a sorting rule's condition and destination."""
+        return _CompiledRule(rule, self._compile_condition(rule.if_), self._compile_destination(rule))
+    
+    def _compile_rules(self) -> None:
+        """Compile every configured sorting rule, preserving rule order."""
+        self._compiled = [self._compile_rule(rule) for rule in self.config.sorting.rules]
+        self._index_rules()
+    
+    def _index_rules(self) -> None:
+        """Pre-select, per file format, the rules that can possibly match.
+        
+        Rules of the form ``format == 'X'`` / ``format != 'X'`` are decided by the
+        format alone, so each format bucket drops the ones that can never match
+        and the inner loop only evaluates the residual rules (in original order).
+        """
+        formats = {
+            compiled.condition.operand for compiled in self._compiled
+            if compiled.condition.field == 'format' and compiled.condition.kind in ('==', '!=')
+        }
+        
+        def can_match(compiled: _CompiledRule, fmt: Optional[str]) -> bool:
+            condition = compiled.condition
+            if condition.field != 'format':
+                return True
+            if condition.kind == '==':
+                return condition.operand == fmt
+            if condition.kind == '!=':
+                return condition.operand != fmt
+            return True
+        
+        self._rules_by_format = {
+            fmt: [compiled for compiled in self._compiled if can_match(compiled, fmt)]
+            for fmt in formats
+        }
+        # Formats no rule mentions explicitly
+        self._rules_other_format = [compiled for compiled in self._compiled if can_match(compiled, None)]
+    
+    def _candidate_rules(self, context: Dict[str, Any]) -> List[_CompiledRule]:
+        """Get the compiled rules worth evaluating for a file context."""
+        return self._rules_by_format.get(context.get('format'), self._rules_other_format)
     
     def _get_file_context(self, file_path: Path, inventory_record: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Get context information for a file."""
-        context = {
-            'path': str(file_path),
-            'filename': file_path.name,
-            'stem': file_path.stem,
-            'suffix': file_path.suffix,
-            'parent': str(file_path.parent),
-            'size': file_path.stat().st_size if file_path.exists() else 0
-        }
+        try:
+            stat = file_path.stat()
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            mtime_ns, size = 0, 0
+        
+        # Path-derived fields are cached; copy before adding inventory fields
+        context = dict(_base_file_context(str(file_path), mtime_ns, size))
         
         # Add inventory information
         if inventory_record:
@@ -232,78 +404,82 @@ class FileSorter:
             
             context['slug'] = slug
         
-        # Try to determine format from extension
-        ext = file_path.suffix.lower()
-        if ext == '.json':
-            context['format'] = 'JSON'
-        elif ext == '.csv':
-            context['format'] = 'CSV'
-        elif ext == '.xlsx':
-            context['format'] = 'XLSX'
-        elif ext == '.xml':
-            context['format'] = 'XML'
-        elif ext == '.zip':
-            context['format'] = 'ZIP'
-        else:
-            context['format'] = 'UNKNOWN'
-        
         return context
     
-    def _apply_rule(self, file_path: Path, rule: SortingRule, context: Dict[str, Any]) -> Optional[Path]:
-        """Apply a single sorting rule to a file."""
+    def _ensure_directory(self, directory: Path) -> None:
+        """Create a directory unless this sorter already ensured it."""
+        key = str(directory)
+        if key not in self._ensured_dirs:
+            ensure_directory(directory)
+            self._ensured_dirs.add(key)
+    
+    def _apply_rule(self, file_path: Path, compiled: _CompiledRule, context: Dict[str, Any]) -> Optional[Path]:
+        """Apply a single compiled sorting rule to a file."""
         # Evaluate condition
-        if not self._evaluate_condition(rule.if_, context):
+        if not compiled.condition.predicate(context):
             return None
         
         # Determine destination
-        if rule.move_to:
-            dest_path = Path(rule.move_to)
-        elif rule.default:
-            dest_path = Path(rule.default)
-        else:
+        if compiled.destination is None:
             return None
         
-        # Make path absolute if relative
-        if not dest_path.is_absolute():
-            dest_path = self.root_dir / dest_path
-        
-        # Ensure destination is a directory
-        if not dest_path.suffix:
-            # It's a directory
-            ensure_directory(dest_path)
-            return dest_path / file_path.name
-        else:
-            # It's a file path
-            ensure_directory(dest_path.parent)
-            return dest_path
+        dest_path = compiled.destination(file_path)
+        self._ensure_directory(dest_path.parent)
+        return dest_path
     
     def _move_file(self, src_path: Path, dest_path: Path) -> bool:
         """Move file atomically and update inventory."""
-        try:
-            if not src_path.exists():
-                return False
-            
-            # Ensure destination directory exists
-            ensure_directory(dest_path.parent)
-            
-            # Move file atomically
-            src_path.replace(dest_path)
-            
-            # Update inventory
-            old_path = str(src_path)
-            new_path = str(dest_path)
-            
-            if old_path in self.inventory:
-                record = self.inventory[old_path]
-                record['path'] = new_path
-                del self.inventory[old_path]
-                self.inventory[new_path] = record
-            
-            return True
+        old_path = str(src_path)
+        new_path = str(dest_path)
         
+        try:
+            # Move file atomically (destination directory was ensured by _apply_rule;
+            # sort_file already checked that the source exists)
+            os.replace(old_path, new_path)
         except Exception as e:
             console.print(f"[red]Error moving {src_path} to {dest_path}: {e}[/red]")
             return False
+        
+        # The file has moved; a journaling failure must not be reported as a failed move
+        self._record_move(old_path, new_path)
+        return True
+    
+    def _record_move(self, old_path: str, new_path: str) -> None:
+        """Update the inventory for a moved file and journal the change."""
+        if old_path not in self.inventory:
+            return
+        
+        record = self.inventory.pop(old_path)
+        record['path'] = new_path
+        self.inventory[new_path] = record
+        
+        # Journal the move right away so a crash mid-sort loses nothing
+        move_records = [{'path': old_path, 'deleted': True}, record]
+        if self._journal is not None:
+            for move_record in move_records:
+                self._journal.append(move_record)
+        else:
+            append_inventory_delta(self.inventory_file, move_records)
+    
+    def _resolve_dir(self, directory: Path) -> Path:
+        """Resolve a directory once and remember the result."""
+        key = str(directory)
+        resolved = self._resolved_dirs.get(key)
+        if resolved is None:
+            resolved = self._resolved_dirs[key] = directory.resolve()
+        return resolved
+    
+    def _same_location(self, first: Path, second: Path) -> bool:
+        """Check whether two file paths point to the same place.
+        
+        Compares strings first; symlinked directories are only resolved
+        (once per unique parent) when the names match but the paths differ.
+        """
+        if str(first) == str(second):
+            return True
+        if first.name != second.name:
+            return False
+        return self._resolve_dir(first.parent) == self._resolve_dir(second.parent)
     
     def sort_file(self, file_path: Path) -> Tuple[bool, Optional[Path], str]:
         """Sort a single file according to rules."""
@@ -315,11 +491,12 @@ class FileSorter:
         context = self._get_file_context(file_path, inventory_record)
         
         # Try each rule in order
-        for rule in self.config.sorting.rules:
-            dest_path = self._apply_rule(file_path, rule, context)
+        for compiled in self._candidate_rules(context):
+            rule = compiled.rule
+            dest_path = self._apply_rule(file_path, compiled, context)
             if dest_path:
                 # Check if destination is different from source
-                if dest_path.resolve() != file_path.resolve():
+                if not self._same_location(dest_path, file_path):
                     success = self._move_file(file_path, dest_path)
                     if success:
                         return True, dest_path, f"Matched rule: {rule.if_}"
@@ -346,38 +523,43 @@ class FileSorter:
         }
         
         # Find all files to sort
-        files_to_sort = []
-        for file_path in self.root_dir.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in {'.json', '.ndjson', '.csv', '.xlsx', '.xml', '.zip'}:
-                files_to_sort.append(file_path)
+        files_to_sort = list(_iter_candidate_files(self.root_dir))
         
         console.print(f"Found {len(files_to_sort)} files to sort")
         
-        for file_path in files_to_sort:
-            stats['files_processed'] += 1
-            
-            success, dest_path, message = self.sort_file(file_path)
-            
-            if success:
-                if dest_path == file_path:
-                    stats['files_already_sorted'] += 1
-                else:
-                    stats['files_moved'] += 1
-                    console.print(f"[green]✓ Moved {file_path.name} to {dest_path.parent.name}/[/green]")
-            else:
-                if "No matching rule" in message:
-                    stats['files_unsorted'] += 1
-                    console.print(f"[yellow]⚠ No rule for {file_path.name}[/yellow]")
-                else:
-                    stats['files_failed'] += 1
-                    stats['errors'].append({
-                        'file': str(file_path),
-                        'error': message
-                    })
-                    console.print(f"[red]✗ Failed to sort {file_path.name}: {message}[/red]")
-        
-        # Save updated inventory
-        save_jsonl(self.inventory_file, list(self.inventory.values()))
+        # Journal moves through one appender so the delta log is fsynced once
+        delta_file = get_inventory_delta_file(self.inventory_file)
+        with JsonlAppender(delta_file) as journal:
+            self._journal = journal
+            try:
+                for file_path in files_to_sort:
+                    stats['files_processed'] += 1
+                    
+                    success, dest_path, message = self.sort_file(file_path)
+                    
+                    if success:
+                        if dest_path == file_path:
+                            stats['files_already_sorted'] += 1
+                        else:
+                            stats['files_moved'] += 1
+                            console.print(f"[green]✓ Moved {file_path.name} to {dest_path.parent.name}/[/green]")
+                    else:
+                        if "No matching rule" in message:
+                            stats['files_unsorted'] += 1
+                            console.print(f"[yellow]⚠ No rule for {file_path.name}[/yellow]")
+                        else:
+                            stats['files_failed'] += 1
+                            stats['errors'].append({
+                                'file': str(file_path),
+                                'error': message
+                            })
+                            console.print(f"[red]✗ Failed to sort {file_path.name}: {message}[/red]")
+            finally:
+                self._journal = None
+        
+        # Moves are already journaled; only compact once the delta log grows large
+        if inventory_needs_compaction(self.inventory_file):
+            save_inventory(self.inventory_file, self.inventory.values())
         
         # Display results
         self._display_sort_stats(stats)
@@ -427,20 +609,19 @@ class FileSorter:
         """Get list of files that don't match any sorting rule."""
         unsorted = []
         
-        for file_path in self.root_dir.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in {'.json', '.ndjson', '.csv', '.xlsx', '.xml', '.zip'}:
-                inventory_record = self.inventory.get(str(file_path))
-                context = self._get_file_context(file_path, inventory_record)
-                
-                # Check if any rule matches
-                matched = False
-                for rule in self.config.sorting.rules:
-                    if self._evaluate_condition(rule.if_, context):
-                        matched = True
-                        break
-                
-                if not matched:
-                    unsorted.append(file_path)
+        for file_path in _iter_candidate_files(self.root_dir):
+            inventory_record = self.inventory.get(str(file_path))
+            context = self._get_file_context(file_path, inventory_record)
+            
+            # Check if any rule matches
+            matched = False
+            for compiled in self._candidate_rules(context):
+                if compiled.condition.predicate(context):
+                    matched = True
+                    break
+            
+            if not matched:
+                unsorted.append(file_path)
         
         return unsorted
     
@@ -454,8 +635,8 @@ class FileSorter:
         context = self._get_file_context(file_path, inventory_record)
         
         # Try each rule in order
-        for rule in self.config.sorting.rules:
-            dest_path = self._apply_rule(file_path, rule, context)
+        for compiled in self._candidate_rules(context):
+            dest_path = self._apply_rule(file_path, compiled, context)
             if dest_path:
                 return dest_path
         
@@ -464,7 +645,9 @@ class FileSorter:
     def add_sorting_rule(self, condition: str, destination: str) -> None:
         """Add a new sorting rule to the configuration."""
         new_rule = SortingRule(if_=condition, move_to=destination)
-        self.config.sorting.rules.append(new_rule)
+        self.config = with_sorting_rules(self.config, (*self.config.sorting.rules, new_rule))
+        self._compiled.append(self._compile_rule(new_rule))
+        self._index_rules()
         
         # Save updated configuration
         from .config import save_config
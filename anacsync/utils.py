@@ -1,67 +1,83 @@
 """Utility functions for ANAC Sync."""
 
 import hashlib
-import json
 import os
 import random
 import time
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, Generator, List, Optional, Union
+from typing import Any, Dict, Generator, Iterable, List, Optional, Union
 
+import orjson
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 
 
 console = Console()
 
+# Read size used when hashing files in Python-level loops
+HASH_CHUNK_SIZE = 1 << 20
 
-def atomic_write(file_path: Path, content: Union[str, bytes], mode: str = 'w') -> None:
-    """Atomically write content to a file."""
-    temp_path = file_path.with_suffix(file_path.suffix + '.tmp')
+# Size hint for the line batches read_jsonl decodes at a time
+JSONL_READ_HINT = 1 << 20
+
+# Units for format_bytes, one per power of 1024
+_BYTE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# Characters not allowed in file names, all mapped to '_'
+_UNSAFE_TRANS = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
+
+def atomic_write(file_path: Path, content: Union[str, bytes], mode: str = 'w', fsync: bool = True) -> None:
+    """Atomically write content to a file.
+    
+    Pass ``fsync=False`` for files that need not survive a power loss.
+    """
+    if mode == 'w':
+        data = content.encode('utf-8')
+    elif mode == 'wb':
+        data = content
+    else:
+        raise ValueError(f"Unsupported mode: {mode}")
+    
+    # Per-process temp name, so concurrent writers never share one
+    temp_path = f"{file_path}.tmp.{os.getpid()}"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
     
     try:
-        if mode == 'w':
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-                # Ensure data is written to disk (only on Unix-like systems)
-                if hasattr(f, 'fileno') and hasattr(os, 'fsync'):
-                    try:
-                        os.fsync(f.fileno())
-                    except (OSError, AttributeError):
-                        # fsync not available or not supported (e.g., Windows)
-                        pass
-        elif mode == 'wb':
-            with open(temp_path, 'wb') as f:
-                f.write(content)
-                # Ensure data is written to disk (only on Unix-like systems)
-                if hasattr(f, 'fileno') and hasattr(os, 'fsync'):
-                    try:
-                        os.fsync(f.fileno())
-                    except (OSError, AttributeError):
-                        # fsync not available or not supported (e.g., Windows)
-                        pass
-        else:
-            raise ValueError(f"Unsupported mode: {mode}")
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            
+            if fsync:
+                try:
+                    os.fsync(fd)
+                except OSError:
+                    # fsync not supported on this filesystem
+                    pass
+        finally:
+            os.close(fd)
         
         # Atomic rename
         os.replace(temp_path, file_path)
-    except Exception:
+    except BaseException:
         # Clean up temp file on error
-        if temp_path.exists():
-            temp_path.unlink()
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
         raise
 
 
 def calculate_sha256(file_path: Path) -> str:
     """Calculate SHA256 hash of a file in streaming mode."""
-    sha256_hash = hashlib.sha256()
-    
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            sha256_hash.update(chunk)
-    
-    return sha256_hash.hexdigest()
+    # file_digest reads in large blocks inside C and lets OpenSSL use SHA-NI
+    with open(file_path, 'rb', buffering=0) as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
 
 
 def calculate_sha256_streaming(file_path: Path, progress_callback: Optional[callable] = None) -> str:
@@ -70,14 +86,18 @@ def calculate_sha256_streaming(file_path: Path, progress_callback: Optional[call
     file_size = file_path.stat().st_size
     bytes_read = 0
     
-    with open(file_path, 'rb') as f:
+    # Reuse one 1 MiB buffer instead of allocating a bytes object per chunk
+    buf = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buf)
+    
+    with open(file_path, 'rb', buffering=0) as f:
         while True:
-            chunk = f.read(8192)
-            if not chunk:
+            n = f.readinto(buf)
+            if not n:
                 break
             
-            sha256_hash.update(chunk)
-            bytes_read += len(chunk)
+            sha256_hash.update(view[:n])
+            bytes_read += n
             
             if progress_callback:
                 progress_callback(bytes_read, file_size)
@@ -85,18 +105,117 @@ def calculate_sha256_streaming(file_path: Path, progress_callback: Optional[call
     return sha256_hash.hexdigest()
 
 
-def append_jsonl(file_path: Path, record: Dict[str, Any]) -> None:
-    """Append a record to a JSONL file atomically."""
-    line = json.dumps(record, ensure_ascii=False) + '\n'
+def compute_sha256_many(paths: Iterable[Path], workers: Optional[int] = None) -> Dict[Path, str]:
+    """Calculate SHA256 hashes of many files concurrently.
+    
+    Threads are enough here because hashlib releases the GIL while hashing.
+    Files that cannot be read are left out of the result.
+    """
+    workers = workers or min(8, os.cpu_count() or 1)
+    digests = {}
+    
+    def hash_one(path: Path) -> tuple:
+        try:
+            return path, calculate_sha256(path)
+        except OSError:
+            return path, None
+    
+    def collect(futures) -> None:
+        for future in futures:
+            path, digest = future.result()
+            if digest is not None:
+                digests[path] = digest
     
-    # Create directory if it doesn't exist
-    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded number of hashes in flight so memory stays flat
+        pending = set()
+        for path in paths:
+            pending.add(executor.submit(hash_one, path))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        
+        collect(wait(pending).done)
     
-    # Append to file
-    with open(file_path, 'a', encoding='utf-8') as f:
-        f.write(line)
-        f.flush()
-        os.fsync(f.fileno())
+    return digests
+
+
+def _encode_jsonl(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Encode records as newline-terminated JSONL in one buffer."""
+    return b''.join(orjson.dumps(record) + b'\n' for record in records)
+
+
+class JsonlAppender:
+    """Append many records to a JSONL file, paying for fsync once.
+    
+    Each record is written straight to the OS (one write() per line), so a
+    process crash loses nothing; durability against power loss comes from the
+    single fsync on exit or on an explicit checkpoint().
+    """
+    
+    def __init__(self, file_path: Path, durable: bool = True):
+        self.file_path = file_path
+        self.durable = durable
+        self._file = None
+    
+    def __enter__(self) -> 'JsonlAppender':
+        # Create directory if it doesn't exist
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.file_path, 'ab', buffering=0)
+        return self
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append a single record."""
+        self._file.write(orjson.dumps(record) + b'\n')
+    
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Append many records with a single write()."""
+        self._file.write(_encode_jsonl(records))
+    
+    def checkpoint(self) -> None:
+        """Force everything appended so far to disk."""
+        os.fsync(self._file.fileno())
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if self.durable:
+                self.checkpoint()
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def append_jsonl(file_path: Path, record: Dict[str, Any], durable: bool = True) -> None:
+    """Append a record to a JSONL file atomically.
+    
+    Use ``durable=False`` to skip the fsync, or append_jsonl_many for many records.
+    """
+    append_jsonl_many(file_path, [record], durable=durable)
+
+
+def append_jsonl_many(file_path: Path, records: Iterable[Dict[str, Any]], durable: bool = True) -> None:
+    """Append records to a JSONL file with one open, one write and one fsync."""
+    with JsonlAppender(file_path, durable=durable) as appender:
+        appender.extend(records)
+
+
+def _decode_jsonl_lines(lines: List[bytes]) -> List[Dict[str, Any]]:
+    """Decode JSONL lines, skipping blank and malformed ones."""
+    try:
+        # Fast path: every line is a valid record
+        return [orjson.loads(line) for line in lines if line]
+    except orjson.JSONDecodeError:
+        pass
+    
+    records = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                records.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
+    return records
 
 
 def read_jsonl(file_path: Path) -> Generator[Dict[str, Any], None, None]:
@@ -104,25 +223,28 @@ def read_jsonl(file_path: Path) -> Generator[Dict[str, Any], None, None]:
     if not file_path.exists():
         return
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    yield json.loads(line)
-                except json.JSONDecodeError:
-                    continue
+    with open(file_path, 'rb') as f:
+        # Decode ~1 MiB batches of lines rather than one line per iteration
+        while True:
+            lines = f.readlines(JSONL_READ_HINT)
+            if not lines:
+                break
+            yield from _decode_jsonl_lines(lines)
 
 
 def load_jsonl(file_path: Path) -> List[Dict[str, Any]]:
     """Load all records from a JSONL file."""
-    return list(read_jsonl(file_path))
+    try:
+        data = file_path.read_bytes()
+    except FileNotFoundError:
+        return []
+    
+    return _decode_jsonl_lines(data.splitlines())
 
 
 def save_jsonl(file_path: Path, records: List[Dict[str, Any]]) -> None:
     """Save records to a JSONL file atomically."""
-    content = '\n'.join(json.dumps(record, ensure_ascii=False) for record in records)
-    atomic_write(file_path, content)
+    atomic_write(file_path, _encode_jsonl(records), mode='wb')
 
 
 def merge_jsonl_records(
@@ -131,18 +253,29 @@ def merge_jsonl_records(
     key_fields: List[str]
 ) -> List[Dict[str, Any]]:
     """Merge new records with existing ones based on key fields."""
+    if len(key_fields) > 1:
+        # itemgetter builds the key tuple in C; fall back for records missing a field
+        getter = itemgetter(*key_fields)
+        
+        def key_of(record: Dict[str, Any]) -> tuple:
+            try:
+                return getter(record)
+            except KeyError:
+                return tuple(record.get(field) for field in key_fields)
+    else:
+        def key_of(record: Dict[str, Any]) -> tuple:
+            return tuple(record.get(field) for field in key_fields)
+    
     # Create lookup for existing records
-    existing_lookup = {}
-    for record in existing_records:
-        key = tuple(record.get(field) for field in key_fields)
-        existing_lookup[key] = record
+    existing_lookup = {key_of(record): record for record in existing_records}
     
     # Merge with new records
     for record in new_records:
-        key = tuple(record.get(field) for field in key_fields)
-        if key in existing_lookup:
+        key = key_of(record)
+        existing = existing_lookup.get(key)
+        if existing is not None:
             # Update existing record
-            existing_lookup[key].update(record)
+            existing.update(record)
         else:
             # Add new record
             existing_lookup[key] = record
@@ -152,11 +285,9 @@ def merge_jsonl_records(
 
 def format_bytes(bytes_count: int) -> str:
     """Format bytes count in human readable format."""
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_count < 1024.0:
-            return f"{bytes_count:.1f} {unit}"
-        bytes_count /= 1024.0
-    return f"{bytes_count:.1f} PB"
+    # Unit index from the bit length: one shift and one division, no loop
+    index = min((int(bytes_count).bit_length() - 1) // 10, 5) if bytes_count >= 1 else 0
+    return f"{bytes_count / (1 << (10 * index)):.1f} {_BYTE_UNITS[index]}"
 
 
 def format_duration(seconds: float) -> str:
@@ -194,22 +325,16 @@ def parse_http_date(date_str: str) -> Optional[datetime]:
     if not date_str:
         return None
     
-    # Common HTTP date formats
-    formats = [
-        '%a, %d %b %Y %H:%M:%S %Z',
-        '%a, %d %b %Y %H:%M:%S GMT',
-        '%A, %d-%b-%y %H:%M:%S %Z',
-        '%A, %d-%b-%y %H:%M:%S GMT',
-        '%a %b %d %H:%M:%S %Y',
-    ]
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
+    # Handles RFC 1123, RFC 850 and asctime formats in one parse
+    try:
+        parsed = parsedate_to_datetime(date_str)
+    except (TypeError, ValueError):
+        return None
     
-    return None
+    # Normalise to GMT and keep returning naive datetimes as before
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
 
 def extract_filename_from_url(url: str, content_disposition: Optional[str] = None) -> str:
@@ -244,13 +369,8 @@ def create_progress_bar(description: str) -> Progress:
 
 def safe_filename(filename: str) -> str:
     """Make filename safe for filesystem."""
-    # Remove or replace unsafe characters
-    unsafe_chars = '<>:"/\\|?*'
-    for char in unsafe_chars:
-        filename = filename.replace(char, '_')
-    
-    # Remove leading/trailing dots and spaces
-    filename = filename.strip('. ')
+    # Replace unsafe characters (single pass) and strip leading/trailing dots and spaces
+    filename = filename.translate(_UNSAFE_TRANS).strip('. ')
     
     # Ensure it's not empty
     if not filename:
@@ -269,16 +389,50 @@ def ensure_directory(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def get_file_info(file_path: Path) -> Dict[str, Any]:
-    """Get file information including size, mtime, and sha256."""
-    if not file_path.exists():
+def iter_files(root: Path) -> Generator[os.DirEntry, None, None]:
+    """Recursively yield directory entries for regular files under root.
+    
+    Uses os.scandir so file type checks come from cached dirent data
+    instead of a stat() call per path.
+    """
+    stack = [str(root)]
+    
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            yield entry
+                    except OSError:
+                        continue
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            continue
+
+
+def get_file_info(file_path: Path, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Get file information including size, mtime, and sha256.
+    
+    A precomputed ``sha256`` skips re-reading the file.
+    """
+    try:
+        if sha256:
+            stat = os.stat(file_path)
+        else:
+            # Stat and hash through the same open file
+            with open(file_path, 'rb', buffering=0) as f:
+                stat = os.fstat(f.fileno())
+                sha256 = hashlib.file_digest(f, 'sha256').hexdigest()
+    except FileNotFoundError:
         return {}
     
-    stat = file_path.stat()
     return {
         'size': stat.st_size,
         'mtime': datetime.fromtimestamp(stat.st_mtime).isoformat() + 'Z',
-        'sha256': calculate_sha256(file_path)
+        'sha256': sha256
     }
 
 
@@ -288,9 +442,16 @@ def retry_with_backoff(
     base_delay: float = 1.0,
     max_delay: float = 60.0,
     backoff_factor: float = 2.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    deadline: Optional[float] = None
 ) -> Any:
-    """Retry function with exponential backoff."""
+    """Retry function with exponential backoff and decorrelated jitter.
+    
+    Each delay is drawn uniformly between ``base_delay`` and the previous delay
+    times ``backoff_factor`` so concurrent workers don't retry in lockstep.
+    If ``deadline`` (seconds) is given, no retry starts after it has elapsed.
+    """
+    start = time.monotonic()
     delay = base_delay
     
     for attempt in range(max_retries + 1):
@@ -300,8 +461,14 @@ def retry_with_backoff(
             if attempt == max_retries:
                 raise e
             
+            delay = min(max_delay, random.uniform(base_delay, delay * backoff_factor))
+            
+            if deadline is not None:
+                remaining = deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    raise e
+                delay = min(delay, remaining)
+            
             time.sleep(delay)
-            delay = min(delay * backoff_factor, max_delay)
     
     raise RuntimeError("Should not reach here")
-
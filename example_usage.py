@@ -24,11 +24,13 @@ def main():
     
     # Create a temporary configuration for testing
     with tempfile.TemporaryDirectory() as tmpdir:
-        # Set up configuration
+        # Set up configuration (configs are immutable, so derive a copy)
         config = get_default_config()
-        config.root_dir = str(Path(tmpdir) / "database" / "JSON")
-        config.state_dir = str(Path(tmpdir) / ".anacsync")
-        config.downloader.rate_limit_rps = 0.5  # Slower for testing
+        config = config.model_copy(update={
+            'root_dir': str(Path(tmpdir) / "database" / "JSON"),
+            'state_dir': str(Path(tmpdir) / ".anacsync"),
+            'downloader': config.downloader.model_copy(update={'rate_limit_rps': 0.5})  # Slower for testing
+        })
         
         print(f"Root directory: {config.root_dir}")
         print(f"State directory: {config.state_dir}")
@@ -38,6 +38,7 @@ setup(
         "python-dotenv>=1.0.0",
         "selectolax>=0.3.0",
         "pyyaml>=6.0",
+        "orjson>=3.8.0",
     ],
     extras_require={
         "dev": [
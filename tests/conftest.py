@@ -0,0 +1,11 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+from anacsync.config import Config
+
+
+@pytest.fixture(scope='session')
+def default_config():
+    """Default Config, validated once per session."""
+    return Config()
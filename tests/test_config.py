@@ -1,12 +1,14 @@
 """Tests for configuration management."""
 
-import tempfile
-from pathlib import Path
+import os
 
 import pytest
 import yaml
+from pydantic import ValidationError
 
-from anacsync.config import Config, load_config, save_config, get_default_config
+from anacsync.config import (
+    Config, SortingRule, load_config, save_config, get_default_config, with_sorting_rules
+)
 
 
 class TestConfig:
@@ -36,6 +38,31 @@ class TestConfig:
         assert config.root_dir == "/test"
         assert config.crawler.page_start == 1
     
+    def test_config_is_frozen(self):
+        """Test that configs are changed by copying, not assignment."""
+        config = Config()
+        
+        with pytest.raises(ValidationError):
+            config.root_dir = "/other"
+        with pytest.raises(ValidationError):
+            config.downloader.enable_curl = False
+        
+        updated = config.model_copy(update={'root_dir': "/other"})
+        assert updated.root_dir == "/other"
+        assert config.root_dir == "/database/JSON"
+    
+    def test_with_sorting_rules(self):
+        """Test that sorting rules are replaced on a copy, not in place."""
+        config = get_default_config()
+        rule = SortingRule(if_="true", move_to="/other")
+        
+        updated = with_sorting_rules(config, (*config.sorting.rules, rule))
+        
+        assert isinstance(config.sorting.rules, tuple)
+        assert len(config.sorting.rules) == 4
+        assert updated.sorting.rules[-1] == rule
+        assert updated.sorting.rules[:4] == config.sorting.rules
+    
     def test_config_default_headers(self):
         """Test default HTTP headers."""
         config = Config()
@@ -52,87 +79,128 @@ class TestConfig:
 class TestConfigIO:
     """Test configuration file I/O."""
     
-    def test_save_load_config(self):
+    def test_save_load_config(self, tmp_path):
         """Test saving and loading configuration."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_path = Path(tmpdir) / "test_config.yaml"
-            
-            # Create config
-            config = get_default_config()
-            config.root_dir = "/test/root"
-            config.downloader.rate_limit_rps = 2.0
-            
-            # Save config
-            save_config(config, str(config_path))
-            
-            # Load config
-            loaded_config = load_config(str(config_path))
-            
-            assert loaded_config.root_dir == "/test/root"
-            assert loaded_config.downloader.rate_limit_rps == 2.0
+        config_path = tmp_path / "test_config.yaml"
+        
+        # Create config
+        config = get_default_config()
+        config = config.model_copy(update={
+            'root_dir': "/test/root",
+            'downloader': config.downloader.model_copy(update={'rate_limit_rps': 2.0})
+        })
+        
+        # Save config
+        save_config(config, str(config_path))
+        
+        # Load config
+        loaded_config = load_config(str(config_path))
+        
+        assert loaded_config.root_dir == "/test/root"
+        assert loaded_config.downloader.rate_limit_rps == 2.0
+    
+    def test_load_config_picks_up_changes(self, tmp_path):
+        """Test that cached parses are invalidated when the file changes."""
+        config_path = tmp_path / "test_config.yaml"
+        
+        config = get_default_config().model_copy(update={
+            'state_dir': str(tmp_path / "state"),
+            'root_dir': "/first"
+        })
+        save_config(config, str(config_path))
+        
+        first = load_config(str(config_path))
+        first.downloader.dynamic_chunks_mb.append(99)
+        second = load_config(str(config_path))
+        assert second.root_dir == "/first"
+        assert second.sorting.rules == config.sorting.rules
+        assert second.downloader.dynamic_chunks_mb == config.downloader.dynamic_chunks_mb
+        
+        config = config.model_copy(update={'root_dir': "/second/root"})
+        save_config(config, str(config_path))
+        
+        assert load_config(str(config_path)).root_dir == "/second/root"
     
-    def test_load_nonexistent_config(self):
+    def test_load_config_ignores_stale_json_copy(self, tmp_path):
+        """Test that a YAML edit wins even when its mtime is older than the JSON copy."""
+        config_path = tmp_path / "test_config.yaml"
+        
+        config = get_default_config().model_copy(update={
+            'state_dir': str(tmp_path / "state"),
+            'root_dir': "/saved"
+        })
+        save_config(config, str(config_path))
+        assert load_config(str(config_path)).root_dir == "/saved"
+        
+        # Edit the YAML and move its mtime back, as git checkout or cp -p can
+        stat = config_path.stat()
+        config_path.write_text(config_path.read_text().replace("/saved", "/edited"))
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 1_000_000_000))
+        
+        assert load_config(str(config_path)).root_dir == "/edited"
+    
+    def test_load_nonexistent_config(self, tmp_path):
         """Test loading nonexistent configuration file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_path = Path(tmpdir) / "nonexistent.yaml"
-            
-            # Should create default config
-            config = load_config(str(config_path))
-            
-            assert config.root_dir == "/database/JSON"
-            assert config.base_url == "https://dati.anticorruzione.it/opendata"
+        config_path = tmp_path / "nonexistent.yaml"
+        
+        # Should create default config
+        config = load_config(str(config_path))
+        
+        assert config.root_dir == "/database/JSON"
+        assert config.base_url == "https://dati.anticorruzione.it/opendata"
     
-    def test_load_empty_config(self):
+    def test_load_empty_config(self, tmp_path):
         """Test loading empty configuration file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_path = Path(tmpdir) / "empty.yaml"
-            config_path.write_text("")
-            
-            # Should create default config
-            config = load_config(str(config_path))
-            
-            assert config.root_dir == "/database/JSON"
+        config_path = tmp_path / "empty.yaml"
+        config_path.write_text("")
+        
+        # Should create default config
+        config = load_config(str(config_path))
+        
+        assert config.root_dir == "/database/JSON"
     
-    def test_config_yaml_format(self):
+    def test_config_yaml_format(self, tmp_path):
         """Test that saved config is valid YAML."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_path = Path(tmpdir) / "test.yaml"
-            
-            config = get_default_config()
-            save_config(config, str(config_path))
-            
-            # Should be valid YAML
-            with open(config_path, 'r') as f:
-                data = yaml.safe_load(f)
-            
-            assert data is not None
-            assert "root_dir" in data
-            assert "crawler" in data
-            assert "downloader" in data
+        config_path = tmp_path / "test.yaml"
+        
+        config = get_default_config()
+        save_config(config, str(config_path))
+        
+        # Should be valid YAML
+        with open(config_path, 'r') as f:
+            data = yaml.safe_load(f)
+        
+        assert data is not None
+        assert "root_dir" in data
+        assert "crawler" in data
+        assert "downloader" in data
 
 
 class TestSortingRules:
     """Test sorting rules configuration."""
     
-    def test_sorting_rule_creation(self):
+    @pytest.mark.parametrize("kwargs, expected_default", [
+        ({"if_": "slug contains 'test'", "move_to": "/test/dir"}, None),
+        ({"if_": "true", "move_to": "/default", "default": "/fallback"}, "/fallback"),
+    ])
+    def test_sorting_rule_creation(self, kwargs, expected_default):
         """Test sorting rule creation."""
         from anacsync.config import SortingRule
         
-        rule = SortingRule(if_="slug contains 'test'", move_to="/test/dir")
+        rule = SortingRule(**kwargs)
         
-        assert rule.if_ == "slug contains 'test'"
-        assert rule.move_to == "/test/dir"
-        assert rule.default is None
+        assert rule.if_ == kwargs["if_"]
+        assert rule.move_to == kwargs["move_to"]
+        assert rule.default == expected_default
     
-    def test_sorting_rule_with_default(self):
-        """Test sorting rule with default."""
+    def test_sorting_rule_from_trusted(self):
+        """Test rebuilding a rule from validated data."""
         from anacsync.config import SortingRule
         
         rule = SortingRule(if_="true", move_to="/default", default="/fallback")
         
-        assert rule.if_ == "true"
-        assert rule.move_to == "/default"
-        assert rule.default == "/fallback"
+        assert SortingRule.from_trusted(rule.model_dump(by_alias=True)) == rule
+        assert SortingRule.from_trusted(rule.model_dump()) == rule
     
     def test_sorting_config_parsing(self):
         """Test sorting configuration parsing."""
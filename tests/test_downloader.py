@@ -1,18 +1,58 @@
 """Tests for downloader strategies."""
 
-import tempfile
-from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import create_autospec, patch
 
 import pytest
 
-from anacsync.config import Config
+from anacsync.http_client import HTTPClient
 from anacsync.downloader.strategies import (
     S1DynamicStrategy, S2SparseStrategy, S3CurlStrategy,
     S4ShortConnStrategy, S5TailFirstStrategy, DownloadResult
 )
 
 
+@pytest.fixture(scope='module', autouse=True)
+def _patch_http():
+    """Patch HTTPClient once for the whole module."""
+    with patch('anacsync.downloader.strategies.HTTPClient') as mock:
+        yield mock
+
+
+@pytest.fixture(scope='module', autouse=True)
+def _patch_run():
+    """Patch subprocess.run once for the whole module."""
+    with patch('subprocess.run') as mock:
+        yield mock
+
+
+@pytest.fixture
+def mock_http_client(_patch_http):
+    """Module-wide HTTPClient mock, reset for each test."""
+    _patch_http.reset_mock(return_value=True, side_effect=True)
+    return _patch_http
+
+
+@pytest.fixture(scope='module')
+def _http_spec():
+    """HTTPClient instance autospec, introspected once for the whole module."""
+    return create_autospec(HTTPClient, instance=True)
+
+
+@pytest.fixture
+def mock_client(_http_spec, mock_http_client):
+    """Autospecced client returned by ``with HTTPClient(...)``, reset for each test."""
+    _http_spec.reset_mock(return_value=True, side_effect=True)
+    mock_http_client.return_value.__enter__.return_value = _http_spec
+    return _http_spec
+
+
+@pytest.fixture
+def mock_run(_patch_run):
+    """Module-wide subprocess.run mock, reset for each test."""
+    _patch_run.reset_mock(return_value=True, side_effect=True)
+    return _patch_run
+
+
 class TestDownloadResult:
     """Test DownloadResult dataclass."""
     
@@ -50,9 +90,9 @@ class TestDownloadResult:
 class TestStrategyBase:
     """Test base strategy functionality."""
     
-    def test_chunk_size_calculation(self):
+    def test_chunk_size_calculation(self, default_config):
         """Test chunk size calculation based on file size."""
-        config = Config()
+        config = default_config
         strategy = S1DynamicStrategy(config)
         
         # Small file
@@ -70,27 +110,27 @@ class TestStrategyBase:
         # No size info
         chunk_size = strategy._get_chunk_size(None)
         assert chunk_size == config.downloader.dynamic_chunks_mb[0] * 1024 * 1024
+        
+        # Boundaries belong to the larger bucket
+        assert strategy._get_chunk_size(50 * 1024 * 1024 - 1) == config.downloader.dynamic_chunks_mb[0] * 1024 * 1024
+        assert strategy._get_chunk_size(50 * 1024 * 1024) == config.downloader.dynamic_chunks_mb[1] * 1024 * 1024
+        assert strategy._get_chunk_size(300 * 1024 * 1024) == config.downloader.dynamic_chunks_mb[2] * 1024 * 1024
 
 
 class TestS1DynamicStrategy:
     """Test S1 Dynamic strategy."""
     
-    def test_strategy_name(self):
+    def test_strategy_name(self, default_config):
         """Test strategy name."""
-        config = Config()
+        config = default_config
         strategy = S1DynamicStrategy(config)
         assert strategy.name == "S1DynamicStrategy"
     
-    @patch('anacsync.downloader.strategies.HTTPClient')
-    def test_fetch_success(self, mock_http_client):
+    def test_fetch_success(self, default_config, mock_client, tmp_path):
         """Test successful fetch."""
-        config = Config()
+        config = default_config
         strategy = S1DynamicStrategy(config)
         
-        # Mock HTTP client
-        mock_client = Mock()
-        mock_http_client.return_value.__enter__.return_value = mock_client
-        
         # Mock resource info
         mock_client.check_resource_info.return_value = {
             'content_length': 1024,
@@ -100,52 +140,45 @@ class TestS1DynamicStrategy:
         # Mock range request
         mock_client.get_range.return_value = (b"test content", {}, None)
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dest_path = Path(tmpdir) / "test.txt"
-            meta = {}
-            
-            result = strategy.fetch("http://example.com/test", dest_path, meta, config)
-            
-            assert result.ok is True
-            assert result.bytes_written > 0
-            assert result.strategy == "S1DynamicStrategy"
-            assert dest_path.exists()
+        dest_path = tmp_path / "test.txt"
+        meta = {}
+        
+        result = strategy.fetch("http://example.com/test", dest_path, meta, config)
+        
+        assert result.ok is True
+        assert result.bytes_written > 0
+        assert result.strategy == "S1DynamicStrategy"
+        assert dest_path.exists()
     
-    @patch('anacsync.downloader.strategies.HTTPClient')
-    def test_fetch_resource_info_error(self, mock_http_client):
+    def test_fetch_resource_info_error(self, default_config, mock_client, tmp_path):
         """Test fetch with resource info error."""
-        config = Config()
+        config = default_config
         strategy = S1DynamicStrategy(config)
         
-        # Mock HTTP client
-        mock_client = Mock()
-        mock_http_client.return_value.__enter__.return_value = mock_client
-        
         # Mock resource info error
         mock_client.check_resource_info.return_value = {'error': 'Network error'}
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dest_path = Path(tmpdir) / "test.txt"
-            meta = {}
-            
-            result = strategy.fetch("http://example.com/test", dest_path, meta, config)
-            
-            assert result.ok is False
-            assert "Failed to get resource info" in result.error
+        dest_path = tmp_path / "test.txt"
+        meta = {}
+        
+        result = strategy.fetch("http://example.com/test", dest_path, meta, config)
+        
+        assert result.ok is False
+        assert "Failed to get resource info" in result.error
 
 
 class TestS2SparseStrategy:
     """Test S2 Sparse strategy."""
     
-    def test_strategy_name(self):
+    def test_strategy_name(self, default_config):
         """Test strategy name."""
-        config = Config()
+        config = default_config
         strategy = S2SparseStrategy(config)
         assert strategy.name == "S2SparseStrategy"
     
-    def test_segment_order(self):
+    def test_segment_order(self, default_config):
         """Test segment order generation."""
-        config = Config()
+        config = default_config
         strategy = S2SparseStrategy(config)
         
         # Test with different numbers of segments
@@ -164,54 +197,52 @@ class TestS2SparseStrategy:
 class TestS3CurlStrategy:
     """Test S3 Curl strategy."""
     
-    def test_strategy_name(self):
+    def test_strategy_name(self, default_config):
         """Test strategy name."""
-        config = Config()
+        config = default_config
         strategy = S3CurlStrategy(config)
         assert strategy.name == "S3CurlStrategy"
     
-    @patch('subprocess.run')
-    def test_fetch_curl_disabled(self, mock_run):
+    def test_fetch_curl_disabled(self, default_config, mock_run, tmp_path):
         """Test fetch with curl disabled."""
-        config = Config()
-        config.downloader.enable_curl = False
+        config = default_config.model_copy(update={
+            'downloader': default_config.downloader.model_copy(update={'enable_curl': False})
+        })
         strategy = S3CurlStrategy(config)
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dest_path = Path(tmpdir) / "test.txt"
-            meta = {}
-            
-            result = strategy.fetch("http://example.com/test", dest_path, meta, config)
-            
-            assert result.ok is False
-            assert "Curl strategy disabled" in result.error
+        dest_path = tmp_path / "test.txt"
+        meta = {}
+        
+        result = strategy.fetch("http://example.com/test", dest_path, meta, config)
+        
+        assert result.ok is False
+        assert "Curl strategy disabled" in result.error
     
-    @patch('subprocess.run')
-    def test_fetch_curl_not_found(self, mock_run):
+    def test_fetch_curl_not_found(self, default_config, mock_run, tmp_path):
         """Test fetch with curl not found."""
-        config = Config()
-        config.downloader.enable_curl = True
+        config = default_config.model_copy(update={
+            'downloader': default_config.downloader.model_copy(update={'enable_curl': True})
+        })
         strategy = S3CurlStrategy(config)
         
         # Mock curl not found
         mock_run.side_effect = FileNotFoundError()
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dest_path = Path(tmpdir) / "test.txt"
-            meta = {}
-            
-            result = strategy.fetch("http://example.com/test", dest_path, meta, config)
-            
-            assert result.ok is False
-            assert "Curl not found" in result.error
+        dest_path = tmp_path / "test.txt"
+        meta = {}
+        
+        result = strategy.fetch("http://example.com/test", dest_path, meta, config)
+        
+        assert result.ok is False
+        assert "Curl not found" in result.error
 
 
 class TestS4ShortConnStrategy:
     """Test S4 Short Connections strategy."""
     
-    def test_strategy_name(self):
+    def test_strategy_name(self, default_config):
         """Test strategy name."""
-        config = Config()
+        config = default_config
         strategy = S4ShortConnStrategy(config)
         assert strategy.name == "S4ShortConnStrategy"
 
@@ -219,34 +250,28 @@ class TestS4ShortConnStrategy:
 class TestS5TailFirstStrategy:
     """Test S5 Tail-First strategy."""
     
-    def test_strategy_name(self):
+    def test_strategy_name(self, default_config):
         """Test strategy name."""
-        config = Config()
+        config = default_config
         strategy = S5TailFirstStrategy(config)
         assert strategy.name == "S5TailFirstStrategy"
     
-    @patch('anacsync.downloader.strategies.HTTPClient')
-    def test_fetch_no_file_size(self, mock_http_client):
+    def test_fetch_no_file_size(self, default_config, mock_client, tmp_path):
         """Test fetch with unknown file size."""
-        config = Config()
+        config = default_config
         strategy = S5TailFirstStrategy(config)
         
-        # Mock HTTP client
-        mock_client = Mock()
-        mock_http_client.return_value.__enter__.return_value = mock_client
-        
         # Mock resource info without file size
         mock_client.check_resource_info.return_value = {
             'content_length': None,
             'etag': 'abc123'
         }
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dest_path = Path(tmpdir) / "test.txt"
-            meta = {}
-            
-            result = strategy.fetch("http://example.com/test", dest_path, meta, config)
-            
-            assert result.ok is False
-            assert "File size unknown" in result.error
+        dest_path = tmp_path / "test.txt"
+        meta = {}
+        
+        result = strategy.fetch("http://example.com/test", dest_path, meta, config)
+        
+        assert result.ok is False
+        assert "File size unknown" in result.error
 
@@ -0,0 +1,167 @@
+"""Tests for the local inventory and its delta log."""
+
+from pathlib import Path
+
+import pytest
+
+from anacsync.config import Config
+from anacsync.inventory import (
+    InventoryScanner, append_inventory_delta, get_inventory_delta_file,
+    inventory_needs_compaction, load_inventory, save_inventory
+)
+from anacsync.utils import read_jsonl
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Config with an empty root directory and state directory."""
+    (tmp_path / "root").mkdir()
+    (tmp_path / "state" / "local").mkdir(parents=True)
+    return Config(root_dir=str(tmp_path / "root"), state_dir=str(tmp_path / "state"))
+
+
+def write_files(root: Path, count: int) -> list:
+    """Create ``count`` small JSON files under ``root``."""
+    paths = []
+    for i in range(count):
+        path = root / f"file{i:02d}.json"
+        path.write_text(f'{{"id": {i}}}')
+        paths.append(path)
+    return paths
+
+
+class TestScanLocal:
+    """Test how scans persist the inventory."""
+    
+    def test_first_scan_writes_snapshot(self, config):
+        """Test that a first scan creates a compacted snapshot."""
+        paths = write_files(Path(config.root_dir), 3)
+        scanner = InventoryScanner(config)
+        
+        stats = scanner.scan_local()
+        
+        assert stats['files_new'] == 3
+        assert {r['path'] for r in read_jsonl(scanner.inventory_file)} == {str(p) for p in paths}
+        assert not get_inventory_delta_file(scanner.inventory_file).exists()
+    
+    def test_changes_append_to_delta(self, config):
+        """Test that changed and removed files go to the delta log only."""
+        paths = write_files(Path(config.root_dir), 20)
+        InventoryScanner(config).scan_local()
+        
+        paths[0].write_text('{"id": "changed"}')
+        paths[1].unlink()
+        scanner = InventoryScanner(config)
+        snapshot = scanner.inventory_file.read_bytes()
+        
+        stats = scanner.scan_local()
+        
+        assert stats['files_updated'] == 1
+        assert stats['files_removed'] == 1
+        assert scanner.inventory_file.read_bytes() == snapshot
+        delta = list(read_jsonl(get_inventory_delta_file(scanner.inventory_file)))
+        assert {'path': str(paths[1]), 'deleted': True} in delta
+        assert [r['path'] for r in delta if not r.get('deleted')] == [str(paths[0])]
+        
+        inventory = load_inventory(scanner.inventory_file)
+        assert str(paths[1]) not in inventory
+        assert inventory[str(paths[0])] == scanner.existing_files[str(paths[0])]
+        assert len(inventory) == 19
+    
+    def test_large_delta_is_compacted(self, config):
+        """Test that a scan compacts once the delta log outgrows the threshold."""
+        paths = write_files(Path(config.root_dir), 8)
+        InventoryScanner(config).scan_local()
+        
+        for path in paths[:4]:
+            path.write_text('{"id": "changed"}')
+        scanner = InventoryScanner(config)
+        scanner.scan_local()
+        
+        assert not get_inventory_delta_file(scanner.inventory_file).exists()
+        assert load_inventory(scanner.inventory_file) == scanner.existing_files
+
+
+class TestInventoryDelta:
+    """Test the snapshot plus delta log persistence helpers."""
+    
+    def test_load_inventory_overlays_delta(self, tmp_path):
+        """Test last-write-wins and deletion tombstones."""
+        inventory_file = tmp_path / "inventory.jsonl"
+        save_inventory(inventory_file, [
+            {'path': 'a', 'size': 1},
+            {'path': 'b', 'size': 2},
+        ])
+        append_inventory_delta(inventory_file, [
+            {'path': 'a', 'size': 10},
+            {'path': 'c', 'size': 3},
+            {'path': 'b', 'deleted': True},
+        ])
+        append_inventory_delta(inventory_file, [
+            {'path': 'a', 'size': 100},
+            {'path': 'c', 'deleted': True},
+            {'path': 'b', 'size': 20},
+        ])
+        
+        assert load_inventory(inventory_file) == {
+            'a': {'path': 'a', 'size': 100},
+            'b': {'path': 'b', 'size': 20},
+        }
+    
+    def test_load_inventory_without_snapshot(self, tmp_path):
+        """Test loading when only a delta log exists."""
+        inventory_file = tmp_path / "inventory.jsonl"
+        append_inventory_delta(inventory_file, [{'path': 'a', 'size': 1}])
+        
+        assert load_inventory(inventory_file) == {'a': {'path': 'a', 'size': 1}}
+        assert load_inventory(tmp_path / "missing.jsonl") == {}
+    
+    def test_compaction_threshold(self, tmp_path):
+        """Test when the delta log is considered large enough to compact."""
+        inventory_file = tmp_path / "inventory.jsonl"
+        save_inventory(inventory_file, [{'path': f'file{i}', 'size': i} for i in range(20)])
+        assert not inventory_needs_compaction(inventory_file)
+        
+        append_inventory_delta(inventory_file, [{'path': 'file0', 'size': 1}])
+        assert not inventory_needs_compaction(inventory_file)
+        
+        append_inventory_delta(inventory_file, [{'path': f'file{i}', 'size': 1} for i in range(10)])
+        assert inventory_needs_compaction(inventory_file)
+    
+    def test_save_inventory_removes_delta(self, tmp_path):
+        """Test that writing a snapshot folds in and drops the delta log."""
+        inventory_file = tmp_path / "inventory.jsonl"
+        append_inventory_delta(inventory_file, [{'path': 'a', 'size': 1}])
+        assert inventory_needs_compaction(inventory_file)
+        
+        save_inventory(inventory_file, load_inventory(inventory_file).values())
+        
+        assert not get_inventory_delta_file(inventory_file).exists()
+        assert not inventory_needs_compaction(inventory_file)
+        assert load_inventory(inventory_file) == {'a': {'path': 'a', 'size': 1}}
+
+
+class TestSidecarMeta:
+    """Test sidecar metadata files."""
+    
+    def test_save_sidecar_meta_many(self, config):
+        """Test that every sidecar of a batch is written."""
+        paths = write_files(Path(config.root_dir), 10)
+        scanner = InventoryScanner(config)
+        
+        scanner.save_sidecar_meta_many(
+            ((path, {'id': i, 'source': 'test'}) for i, path in enumerate(paths)),
+            max_workers=4
+        )
+        
+        for i, path in enumerate(paths):
+            assert scanner.load_sidecar_meta(path) == {'id': i, 'source': 'test'}
+    
+    def test_save_sidecar_meta_many_raises_worker_error(self, config):
+        """Test that an error in a worker reaches the caller."""
+        paths = write_files(Path(config.root_dir), 3)
+        scanner = InventoryScanner(config)
+        pairs = [(paths[0], {'id': 0}), (paths[1], {'bad': object()}), (paths[2], {'id': 2})]
+        
+        with pytest.raises(TypeError):
+            scanner.save_sidecar_meta_many(pairs, max_workers=2)
@@ -0,0 +1,102 @@
+"""Tests for the file sorter."""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from anacsync.config import Config, SortingConfig, SortingRule
+from anacsync.inventory import load_inventory
+from anacsync.sorter import FileSorter
+
+
+def make_config(tmp_path: Path, *rules: SortingRule) -> Config:
+    """Build a config rooted in a temporary directory."""
+    root = tmp_path / "root"
+    root.mkdir(exist_ok=True)
+    return Config(
+        root_dir=str(root),
+        state_dir=str(tmp_path / "state"),
+        sorting=SortingConfig(rules=rules)
+    )
+
+
+class TestMoveJournal:
+    """Test journaling of moved files to the inventory delta log."""
+    
+    def test_move_after_failed_sort_all(self, tmp_path, monkeypatch):
+        """Test that a failed sort_all leaves no stale journal behind."""
+        config = make_config(tmp_path, SortingRule(if_="true", move_to="sorted"))
+        src = Path(config.root_dir) / "a.json"
+        src.write_text("{}")
+        sorter = FileSorter(config)
+        sorter.inventory[str(src)] = {'path': str(src), 'size': 2}
+        
+        monkeypatch.setattr(sorter, 'sort_file', Mock(side_effect=RuntimeError("boom")))
+        with pytest.raises(RuntimeError):
+            sorter.sort_all()
+        monkeypatch.undo()
+        
+        dest = Path(config.root_dir) / "a-moved.json"
+        assert sorter._move_file(src, dest) is True
+        
+        inventory = load_inventory(sorter.inventory_file)
+        assert str(src) not in inventory
+        assert inventory[str(dest)]['path'] == str(dest)
+
+
+class TestRuleIndex:
+    """Test compiled rules and their per-format index."""
+    
+    def test_format_buckets_keep_rule_order(self, tmp_path):
+        """Test that each bucket filters format rules and keeps config order."""
+        rules = [
+            SortingRule(if_="filename contains 'x'", move_to="first"),
+            SortingRule(if_="format == 'CSV'", move_to="csv"),
+            SortingRule(if_="format != 'JSON'", move_to="not-json"),
+            SortingRule(if_="format == 'JSON'", move_to="json"),
+            SortingRule(if_="true", move_to="last"),
+        ]
+        sorter = FileSorter(make_config(tmp_path, *rules))
+        
+        def destinations(fmt):
+            return [compiled.rule.move_to for compiled in sorter._candidate_rules({'format': fmt})]
+        
+        assert destinations('CSV') == ["first", "csv", "not-json", "last"]
+        assert destinations('JSON') == ["first", "json", "last"]
+        # Formats no rule mentions fall back to the rules not tied to a format
+        assert destinations('XML') == ["first", "not-json", "last"]
+        assert destinations(None) == ["first", "not-json", "last"]
+    
+    def test_candidate_rules_pick_first_match(self, tmp_path):
+        """Test that sorting applies the first matching rule in order."""
+        rules = [
+            SortingRule(if_="format != 'JSON'", move_to="other"),
+            SortingRule(if_="filename matches '^a'", move_to="a-files"),
+            SortingRule(if_="format == 'JSON'", move_to="json"),
+        ]
+        config = make_config(tmp_path, *rules)
+        root = Path(config.root_dir)
+        for name in ("a.json", "b.json", "c.csv"):
+            (root / name).write_text("{}")
+        sorter = FileSorter(config)
+        
+        assert sorter.preview_sort(root / "a.json") == root / "a-files" / "a.json"
+        assert sorter.preview_sort(root / "b.json") == root / "json" / "b.json"
+        assert sorter.preview_sort(root / "c.csv") == root / "other" / "c.csv"
+    
+    def test_invalid_expression_never_matches(self, tmp_path):
+        """Test that an unparsable condition compiles to a rule that never matches."""
+        rules = [
+            SortingRule(if_="filename ==== (", move_to="broken"),
+            SortingRule(if_="true", move_to="fallback"),
+        ]
+        config = make_config(tmp_path, *rules)
+        root = Path(config.root_dir)
+        (root / "a.json").write_text("{}")
+        sorter = FileSorter(config)
+        
+        broken = sorter._compiled[0]
+        assert broken.condition.kind == 'invalid'
+        assert broken.condition.predicate({'filename': 'a.json', 'format': 'JSON'}) is False
+        assert sorter.preview_sort(root / "a.json") == root / "fallback" / "a.json"
@@ -1,150 +1,253 @@
 """Tests for utility functions."""
 
-import tempfile
-from pathlib import Path
+import hashlib
+from datetime import datetime
 
+import orjson
 import pytest
 
+from anacsync import utils
 from anacsync.utils import (
-    atomic_write, calculate_sha256, append_jsonl, read_jsonl,
-    load_jsonl, save_jsonl, format_bytes, format_duration,
-    safe_filename, get_file_info
+    atomic_write, calculate_sha256, calculate_sha256_streaming,
+    compute_sha256_many, append_jsonl, append_jsonl_many, read_jsonl,
+    load_jsonl, save_jsonl, format_bytes, format_duration, parse_http_date,
+    safe_filename, get_file_info, iter_files, JsonlAppender, retry_with_backoff
 )
 
 
 class TestAtomicWrite:
     """Test atomic write functionality."""
     
-    def test_atomic_write_text(self):
+    def test_atomic_write_text(self, tmp_path):
         """Test atomic write of text content."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.txt"
-            content = "Hello, World!"
-            
-            atomic_write(file_path, content)
-            
-            assert file_path.exists()
-            assert file_path.read_text() == content
-    
-    def test_atomic_write_binary(self):
+        file_path = tmp_path / "test.txt"
+        content = "Hello, World!"
+        
+        atomic_write(file_path, content, fsync=False)
+        
+        assert file_path.exists()
+        assert file_path.read_text() == content
+        assert list(tmp_path.iterdir()) == [file_path]
+    
+    def test_atomic_write_binary(self, tmp_path):
         """Test atomic write of binary content."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.bin"
-            content = b"Hello, World!"
-            
-            atomic_write(file_path, content, mode='wb')
-            
-            assert file_path.exists()
-            assert file_path.read_bytes() == content
-    
-    def test_atomic_write_cleanup_on_error(self):
+        file_path = tmp_path / "test.bin"
+        content = b"Hello, World!"
+        
+        atomic_write(file_path, content, mode='wb')
+        
+        assert file_path.exists()
+        assert file_path.read_bytes() == content
+    
+    def test_atomic_write_cleanup_on_error(self, tmp_path):
         """Test that temp file is cleaned up on error."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.txt"
-            
-            # This should raise an error due to invalid mode
-            with pytest.raises(ValueError):
-                atomic_write(file_path, "content", mode='invalid')
-            
-            # Temp file should not exist
-            temp_path = file_path.with_suffix(file_path.suffix + '.tmp')
-            assert not temp_path.exists()
+        file_path = tmp_path / "test.txt"
+        
+        # This should raise an error due to invalid mode
+        with pytest.raises(ValueError):
+            atomic_write(file_path, "content", mode='invalid')
+        
+        # Temp file should not exist
+        temp_path = file_path.with_suffix(file_path.suffix + '.tmp')
+        assert not temp_path.exists()
+        
+        # Nor should one be left behind when the write itself fails
+        with pytest.raises(TypeError):
+            atomic_write(file_path, 123, mode='wb')
+        assert list(tmp_path.iterdir()) == []
 
 
 class TestHashing:
     """Test hashing functionality."""
     
-    def test_calculate_sha256(self):
+    def test_calculate_sha256(self, tmp_path):
         """Test SHA256 calculation."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.txt"
-            content = "Hello, World!"
-            file_path.write_text(content)
-            
-            hash_value = calculate_sha256(file_path)
-            
-            # SHA256 of "Hello, World!" should be consistent
-            expected = "dffd6021bb2bd5b0af676290809ec3a53191dd81c7f70a4b28688a362182986f"
-            assert hash_value == expected
-    
-    def test_calculate_sha256_empty_file(self):
+        file_path = tmp_path / "test.txt"
+        content = "Hello, World!"
+        file_path.write_text(content)
+        
+        hash_value = calculate_sha256(file_path)
+        
+        # SHA256 of "Hello, World!" should be consistent
+        expected = "dffd6021bb2bd5b0af676290809ec3a53191dd81c7f70a4b28688a362182986f"
+        assert hash_value == expected
+    
+    def test_calculate_sha256_empty_file(self, tmp_path):
         """Test SHA256 calculation for empty file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "empty.txt"
-            file_path.touch()
-            
-            hash_value = calculate_sha256(file_path)
-            
-            # SHA256 of empty string
-            expected = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
-            assert hash_value == expected
+        file_path = tmp_path / "empty.txt"
+        file_path.touch()
+        
+        hash_value = calculate_sha256(file_path)
+        
+        # SHA256 of empty string
+        expected = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+        assert hash_value == expected
+    
+    def test_calculate_sha256_large_file(self, tmp_path):
+        """Test SHA256 calculation for a file larger than one read block."""
+        file_path = tmp_path / "large.bin"
+        content = bytes(range(256)) * 5000
+        file_path.write_bytes(content)
+        
+        assert calculate_sha256(file_path) == hashlib.sha256(content).hexdigest()
+    
+    def test_calculate_sha256_streaming(self, tmp_path):
+        """Test streaming SHA256 across several buffer refills."""
+        file_path = tmp_path / "large.bin"
+        file_path.write_bytes(bytes(range(256)) * 10000)  # ~2.4 MiB
+        progress = []
+        
+        hash_value = calculate_sha256_streaming(
+            file_path, lambda done, total: progress.append((done, total))
+        )
+        
+        assert hash_value == calculate_sha256(file_path)
+        assert len(progress) > 1
+        assert progress[-1] == (2560000, 2560000)
+    
+    def test_compute_sha256_many(self, tmp_path):
+        """Test concurrent SHA256 calculation for many files."""
+        paths = []
+        for i in range(20):
+            file_path = tmp_path / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            paths.append(file_path)
+        missing = tmp_path / "missing.txt"
+        
+        digests = compute_sha256_many(paths + [missing], workers=4)
+        
+        assert missing not in digests
+        assert digests == {path: calculate_sha256(path) for path in paths}
 
 
 class TestJSONL:
     """Test JSONL functionality."""
     
-    def test_append_jsonl(self):
+    def test_append_jsonl(self, tmp_path):
         """Test appending to JSONL file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.jsonl"
-            
-            # Append first record
-            record1 = {"id": 1, "name": "test1"}
-            append_jsonl(file_path, record1)
-            
-            # Append second record
-            record2 = {"id": 2, "name": "test2"}
-            append_jsonl(file_path, record2)
-            
-            # Read back
-            records = list(read_jsonl(file_path))
-            
-            assert len(records) == 2
-            assert records[0] == record1
-            assert records[1] == record2
-    
-    def test_save_load_jsonl(self):
+        file_path = tmp_path / "test.jsonl"
+        
+        # Append first record
+        record1 = {"id": 1, "name": "test1"}
+        append_jsonl(file_path, record1)
+        
+        # Append second record
+        record2 = {"id": 2, "name": "test2"}
+        append_jsonl(file_path, record2)
+        
+        # Read back
+        records = list(read_jsonl(file_path))
+        
+        assert len(records) == 2
+        assert records[0] == record1
+        assert records[1] == record2
+    
+    def test_jsonl_appender(self, tmp_path):
+        """Test appending many records through one appender."""
+        file_path = tmp_path / "nested" / "test.jsonl"
+        records = [{"id": i, "name": f"test{i}"} for i in range(5)]
+        
+        with JsonlAppender(file_path) as appender:
+            for record in records:
+                appender.append(record)
+            appender.checkpoint()
+        
+        append_jsonl(file_path, {"id": 5}, durable=False)
+        
+        assert list(read_jsonl(file_path)) == records + [{"id": 5}]
+    
+    def test_append_jsonl_many(self, tmp_path):
+        """Test appending a batch of records after a saved file."""
+        file_path = tmp_path / "test.jsonl"
+        
+        save_jsonl(file_path, [{"id": 0}])
+        append_jsonl_many(file_path, [{"id": 1}, {"id": 2}], durable=False)
+        
+        assert load_jsonl(file_path) == [{"id": 0}, {"id": 1}, {"id": 2}]
+    
+    def test_save_load_jsonl(self, tmp_path):
         """Test saving and loading JSONL."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.jsonl"
-            
-            records = [
-                {"id": 1, "name": "test1"},
-                {"id": 2, "name": "test2"}
-            ]
-            
-            save_jsonl(file_path, records)
-            loaded_records = load_jsonl(file_path)
-            
-            assert loaded_records == records
-    
-    def test_read_jsonl_empty_file(self):
+        file_path = tmp_path / "test.jsonl"
+        
+        records = [
+            {"id": 1, "name": "test1"},
+            {"id": 2, "name": "test2"}
+        ]
+        
+        save_jsonl(file_path, records)
+        loaded_records = load_jsonl(file_path)
+        
+        assert loaded_records == records
+    
+    def test_read_jsonl_batches(self, tmp_path, monkeypatch):
+        """Test reading across several line batches and an unterminated last line."""
+        monkeypatch.setattr(utils, 'JSONL_READ_HINT', 16)
+        file_path = tmp_path / "test.jsonl"
+        records = [{"id": i, "name": f"test{i}"} for i in range(50)]
+        file_path.write_bytes(b'\n'.join(orjson.dumps(record) for record in records) + b'\n\nbad\n{"id": 50}')
+        
+        assert list(read_jsonl(file_path)) == records + [{"id": 50}]
+        assert load_jsonl(file_path) == records + [{"id": 50}]
+    
+    def test_read_jsonl_empty_file(self, tmp_path):
         """Test reading from empty JSONL file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "empty.jsonl"
-            file_path.touch()
-            
-            records = list(read_jsonl(file_path))
-            assert records == []
+        file_path = tmp_path / "empty.jsonl"
+        file_path.touch()
+        
+        records = list(read_jsonl(file_path))
+        assert records == []
 
 
 class TestFormatting:
     """Test formatting functions."""
     
-    def test_format_bytes(self):
+    @pytest.mark.parametrize("bytes_count, expected", [
+        (0, "0.0 B"),
+        (1023, "1023.0 B"),
+        (1024, "1.0 KB"),
+        (1536, "1.5 KB"),
+        (1024 * 1024, "1.0 MB"),
+        (1024 * 1024 * 1024, "1.0 GB"),
+        (1024 * 1024 * 1024 * 1024, "1.0 TB"),
+        (1024 ** 6, "1024.0 PB"),
+    ])
+    def test_format_bytes(self, bytes_count, expected):
         """Test byte formatting."""
-        assert format_bytes(0) == "0.0 B"
-        assert format_bytes(1024) == "1.0 KB"
-        assert format_bytes(1024 * 1024) == "1.0 MB"
-        assert format_bytes(1024 * 1024 * 1024) == "1.0 GB"
-        assert format_bytes(1024 * 1024 * 1024 * 1024) == "1.0 TB"
+        assert format_bytes(bytes_count) == expected
     
-    def test_format_duration(self):
+    @pytest.mark.parametrize("seconds, expected", [
+        (0, "0.0s"),
+        (30, "30.0s"),
+        (60, "1.0m"),
+        (90, "1.5m"),
+        (3600, "1.0h"),
+        (7200, "2.0h"),
+    ])
+    def test_format_duration(self, seconds, expected):
         """Test duration formatting."""
-        assert format_duration(30) == "30.0s"
-        assert format_duration(90) == "1.5m"
-        assert format_duration(3600) == "1.0h"
-        assert format_duration(7200) == "2.0h"
+        assert format_duration(seconds) == expected
+
+
+class TestParseHttpDate:
+    """Test HTTP date parsing."""
+    
+    @pytest.mark.parametrize("date_str, expected", [
+        ("Sun, 06 Nov 1994 08:49:37 GMT", datetime(1994, 11, 6, 8, 49, 37)),
+        ("Sunday, 06-Nov-94 08:49:37 GMT", datetime(1994, 11, 6, 8, 49, 37)),
+        ("Sun Nov  6 08:49:37 1994", datetime(1994, 11, 6, 8, 49, 37)),
+        ("Sun, 06 Nov 1994 08:49:37 +0200", datetime(1994, 11, 6, 6, 49, 37)),
+    ])
+    def test_parse_http_date(self, date_str, expected):
+        """Test RFC 1123, RFC 850, asctime and offset dates as naive GMT."""
+        parsed = parse_http_date(date_str)
+        
+        assert parsed == expected
+        assert parsed.tzinfo is None
+    
+    @pytest.mark.parametrize("date_str", ["", "not a date"])
+    def test_parse_http_date_invalid(self, date_str):
+        """Test that unparsable dates return None."""
+        assert parse_http_date(date_str) is None
 
 
 class TestSafeFilename:
@@ -160,6 +263,7 @@ class TestSafeFilename:
         assert safe_filename("test<file>.txt") == "test_file_.txt"
         assert safe_filename("test:file.txt") == "test_file.txt"
         assert safe_filename("test/file.txt") == "test_file.txt"
+        assert safe_filename('a"b\\c|d?e*f.txt') == "a_b_c_d_e_f.txt"
     
     def test_safe_filename_empty(self):
         """Test empty filename handling."""
@@ -175,29 +279,82 @@ class TestSafeFilename:
         assert safe_name.endswith(".txt")
 
 
+class TestIterFiles:
+    """Test recursive file iteration."""
+    
+    def test_iter_files_recursive(self, tmp_path):
+        """Test that nested files are found and directories are skipped."""
+        root = tmp_path
+        (root / "a" / "b").mkdir(parents=True)
+        (root / "top.json").write_text("{}")
+        (root / "a" / "b" / "nested.json").write_text("{}")
+        
+        paths = sorted(entry.path for entry in iter_files(root))
+        
+        assert paths == sorted([
+            str(root / "a" / "b" / "nested.json"),
+            str(root / "top.json")
+        ])
+    
+    def test_iter_files_missing_root(self, tmp_path):
+        """Test iterating a nonexistent directory."""
+        assert list(iter_files(tmp_path / "missing")) == []
+
+
 class TestFileInfo:
     """Test file info functionality."""
     
-    def test_get_file_info(self):
+    def test_get_file_info(self, tmp_path):
         """Test getting file information."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "test.txt"
-            content = "Hello, World!"
-            file_path.write_text(content)
-            
-            info = get_file_info(file_path)
-            
-            assert info['size'] == len(content)
-            assert 'mtime' in info
-            assert 'sha256' in info
-            assert info['sha256'] == calculate_sha256(file_path)
-    
-    def test_get_file_info_nonexistent(self):
+        file_path = tmp_path / "test.txt"
+        content = "Hello, World!"
+        file_path.write_text(content)
+        
+        info = get_file_info(file_path)
+        
+        assert info['size'] == len(content)
+        assert 'mtime' in info
+        assert 'sha256' in info
+        assert info['sha256'] == calculate_sha256(file_path)
+    
+    def test_get_file_info_nonexistent(self, tmp_path):
         """Test getting info for nonexistent file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_path = Path(tmpdir) / "nonexistent.txt"
-            
-            info = get_file_info(file_path)
-            
-            assert info == {}
+        file_path = tmp_path / "nonexistent.txt"
+        
+        info = get_file_info(file_path)
+        
+        assert info == {}
+
 
+class TestRetry:
+    """Test retry with backoff."""
+    
+    def test_retry_succeeds_after_failures(self):
+        """Test that a flaky call is retried until it succeeds."""
+        calls = []
+        
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ValueError("boom")
+            return "ok"
+        
+        result = retry_with_backoff(flaky, max_retries=3, base_delay=0.001, max_delay=0.01)
+        
+        assert result == "ok"
+        assert len(calls) == 3
+    
+    def test_retry_stops_at_deadline(self):
+        """Test that no retry starts once the deadline has passed."""
+        calls = []
+        
+        def failing():
+            calls.append(1)
+            raise ValueError("boom")
+        
+        with pytest.raises(ValueError):
+            retry_with_backoff(
+                failing, max_retries=100, base_delay=0.01, max_delay=0.01, deadline=0.05
+            )
+        
+        assert len(calls) < 100